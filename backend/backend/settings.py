@@ -110,6 +110,12 @@ MODEL_NAME = os.environ.get("MODEL_NAME", "")
 MODEL_API_ENDPOINT = os.environ.get("MODEL_API_ENDPOINT", "")
 MODEL_KEY = os.environ.get("MODEL_KEY", "")
 GPT = os.environ.get("GPT", False)
+STOCKFISH_THREADS = int(
+    os.environ.get("STOCKFISH_THREADS", max(1, (os.cpu_count() or 1) // 2))
+)
+STOCKFISH_HASH_MB = int(os.environ.get("STOCKFISH_HASH_MB", "128"))
+STOCKFISH_EVAL_DEPTH = int(os.environ.get("STOCKFISH_EVAL_DEPTH", "10"))
+STOCKFISH_EVAL_TIME = float(os.environ.get("STOCKFISH_EVAL_TIME", "0.1"))
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -157,6 +163,16 @@ TEMPLATES = [
 WSGI_APPLICATION = "backend.wsgi.application"
 AUTH_USER_MODEL = "users.CustomUser"
 
+# Argon2 hashes new passwords; existing PBKDF2 hashes still verify and are
+# upgraded to Argon2 on the user's next successful login.
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -173,9 +189,7 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
 }
 
@@ -1,3 +1,13 @@
+import asyncio
+
 import pytest
 
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 pytestmark = pytest.mark.django_db
@@ -6,27 +6,25 @@ import random
 import time
 
 import chess
-import redis.asyncio as aioredis
+import orjson
 import sentry_sdk  # Monitoring/analytics
 from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.exceptions import DenyConnection
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.conf import settings
-from redis.asyncio import ConnectionPool
 
-from core.tasks import analyze_game_task, run_ai_move_task
+from core.tasks import GAME_CACHE_TTL, analyze_game_task, run_ai_move_task
 from core.utils import (
     calculate_elo,
+    dumps_json,
     evaluate_board,
     get_redis,
-    is_valid_fen,
     update_fen,
 )
 from users.models import CustomUser
 
 from .models import STARTING_FEN, Game, Move
-from .serializers import GameSerializer
+from .serializers import serialize_game_fast
 
 logger = logging.getLogger(__name__)
 
@@ -68,7 +66,7 @@ async def get_quiz_question(game, subject):
             logger.info(
                 f"Quiz questions found in Redis for game {game_code}, subject {subject}"
             )
-            questions = json.loads(questions_json)
+            questions = orjson.loads(questions_json)
             if isinstance(questions, list) and questions:
                 selected_question = random.choice(questions)
                 logger.info(
@@ -105,12 +103,14 @@ async def get_quiz_question(game, subject):
         def get_quiz_from_db():
             from .models import QuizQuestion
 
-            questions = QuizQuestion.objects.filter(
-                subject=subject, avg_elo__gte=min_elo, avg_elo__lte=max_elo
-            )[:5]
-            if not questions.exists():
-                questions = QuizQuestion.objects.filter(subject=subject)[:5]
-            if questions.exists():
+            questions = list(
+                QuizQuestion.objects.filter(
+                    subject=subject, avg_elo__gte=min_elo, avg_elo__lte=max_elo
+                )[:5]
+            )
+            if not questions:
+                questions = list(QuizQuestion.objects.filter(subject=subject)[:5])
+            if questions:
                 question = random.choice(questions)
                 return {
                     "subject": question.subject,
@@ -150,13 +150,6 @@ async def get_quiz_question(game, subject):
     }
 
 
-REDIS_URL = getattr(settings, "REDIS_URL", "redis://localhost:6379/0")
-
-
-def get_redis():
-    return aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
-
-
 @database_sync_to_async
 def get_game_by_code(game_code):
     return Game.objects.get(code=game_code)
@@ -198,24 +191,6 @@ async def get_fen(game):
     return sanitize_fen_for_frontend(game.fen)
 
 
-def is_valid_fen(fen):
-    try:
-        chess.Board(fen)
-        return True
-    except Exception:
-        return False
-
-
-async def update_fen(game, fen):
-    if not is_valid_fen(fen):
-        logger.error(f"Attempted to save invalid FEN: {fen}")
-        raise ValueError(f"Invalid FEN attempted to be saved: {fen}")
-    game.fen = fen
-    await database_sync_to_async(game.save)()
-    redis = get_redis()
-    await redis.set(f"game:{game.code}:fen", fen)
-
-
 @database_sync_to_async
 def create_move(game, player, move_data, quiz_required=False, quiz_correct=None):
     return Move.objects.create(
@@ -241,14 +216,7 @@ def get_pending_quiz_move(game, move_number):
 
 @sync_to_async
 def serialize_game(game):
-    from django.core.serializers.json import DjangoJSONEncoder
-    import json
-
-    serializer = GameSerializer(game)
-    data = serializer.data
-
-    json_str = json.dumps(data, cls=DjangoJSONEncoder)
-    return json.loads(json_str)
+    return serialize_game_fast(game)
 
 
 def ws_error_handler(func):
@@ -289,7 +257,7 @@ class GameConsumer(AsyncWebsocketConsumer):
     async def send_json(self, data):
         if "message" in data and "type" not in data:
             data["type"] = data.pop("message")
-        await self.send(text_data=json.dumps(data))
+        await self.send(text_data=dumps_json(data).decode())
 
     @ws_error_handler
     async def connect(self):
@@ -374,7 +342,7 @@ class GameConsumer(AsyncWebsocketConsumer):
 
     @ws_error_handler
     async def receive(self, text_data):
-        data = json.loads(text_data)
+        data = orjson.loads(text_data)
         logger.info(f"Received data: {data}")
         event_type = data.get("type")
         user = self.scope["user"]
@@ -1246,6 +1214,14 @@ class GameConsumer(AsyncWebsocketConsumer):
     async def game_over(self, event):
         await self.send_json({"type": "game_over", "payload": event.get("payload", {})})
 
+    async def move_batch(self, event):
+        payload = event.get("payload", {})
+        await self.send_json({"type": "move", "payload": payload.get("move", {})})
+        if payload.get("game_over"):
+            await self.send_json({"type": "game_over", "payload": payload["game_over"]})
+        if payload.get("game"):
+            await self.send_json({"type": "game_update", "payload": payload["game"]})
+
     async def draw_offer(self, event):
         await self.send_json(
             {"type": "draw_offer", "payload": event.get("payload", {})}
@@ -1368,19 +1344,8 @@ class GameConsumer(AsyncWebsocketConsumer):
 async def update_game_cache_and_broadcast(game, channel_layer, room_group_name):
     redis = get_redis()
 
-    @database_sync_to_async
-    def serialize_game(game):
-        from django.core.serializers.json import DjangoJSONEncoder
-        import json
-
-        serializer = GameSerializer(game)
-        data = serializer.data
-
-        json_str = json.dumps(data, cls=DjangoJSONEncoder)
-        return json.loads(json_str)
-
-    game_data = await serialize_game(game)
-    await redis.set(f"game:{game.code}:data", json.dumps(game_data))
+    game_data = await database_sync_to_async(serialize_game_fast)(game)
+    await redis.set(f"game:{game.code}:data", dumps_json(game_data), ex=GAME_CACHE_TTL)
     await channel_layer.group_send(
         room_group_name,
         {
@@ -19,8 +19,8 @@ logger = logging.getLogger(__name__)
 class MatchmakingService:
     """Elo-based matchmaking service with win/loss ratio consideration.
 
-    Thread-safe: Uses Redis for state management and creates fresh connections per instance.
-    Each consumer should create its own instance to avoid connection sharing issues.
+    Thread-safe: Uses Redis for state management through the pooled client for
+    the current event loop. Each consumer should create its own instance.
     """
 
     def __init__(self):
@@ -1,10 +1,11 @@
-import json
+import asyncio
 import logging
 import time
 from typing import Dict, Optional
 
+import msgspec
 from channels.db import database_sync_to_async
-from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.layers import get_channel_layer
 
 from core.matchmaking import MatchmakingService
@@ -13,18 +14,83 @@ from users.models import CustomUser
 
 logger = logging.getLogger(__name__)
 
+MATCH_RETRY_DELAY = 2  # seconds
+MATCH_RETRY_QUEUE_SIZE = 10000
+MATCH_RETRY_WORKERS = 4
 
-class MatchmakingConsumer(AsyncWebsocketConsumer):
+
+class MatchmakingMessage(msgspec.Struct):
+    """Envelope shared by every matchmaking WebSocket message."""
+
+    type: Optional[str] = None
+    payload: dict = {}
+
+
+_DECODER = msgspec.json.Decoder(MatchmakingMessage)
+_ENCODER = msgspec.json.Encoder()
+PONG = MatchmakingMessage(type="pong")
+
+_retry_queue: Optional[asyncio.Queue] = None
+_retry_loop = None
+_retry_workers = []
+
+
+async def _match_retry_worker(queue: asyncio.Queue):
+    """Wait out each queued retry's delay, then ping the searching user's group."""
+    loop = asyncio.get_running_loop()
+    channel_layer = get_channel_layer()
+    while True:
+        due, user_id, search_id, user_data = await queue.get()
+        try:
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await channel_layer.group_send(
+                f"user_{user_id}",
+                {
+                    "type": "match_retry",
+                    "payload": {"search_id": search_id, "user_data": user_data},
+                },
+            )
+        except Exception as e:
+            logger.error(f"Error dispatching match retry for user {user_id}: {e}")
+        finally:
+            queue.task_done()
+
+
+def _get_retry_queue() -> asyncio.Queue:
+    """Return the shared retry queue, starting its workers on the running loop."""
+    global _retry_queue, _retry_loop
+    loop = asyncio.get_running_loop()
+    if _retry_queue is None or _retry_loop is not loop:
+        _retry_queue = asyncio.Queue(maxsize=MATCH_RETRY_QUEUE_SIZE)
+        _retry_loop = loop
+        _retry_workers.clear()
+        for _ in range(MATCH_RETRY_WORKERS):
+            _retry_workers.append(loop.create_task(_match_retry_worker(_retry_queue)))
+    return _retry_queue
+
+
+class MatchmakingConsumer(AsyncJsonWebsocketConsumer):
     """WebSocket consumer for handling matchmaking requests."""
 
+    @classmethod
+    async def decode_json(cls, text_data: str) -> MatchmakingMessage:
+        return _DECODER.decode(text_data)
+
+    @classmethod
+    async def encode_json(cls, content) -> str:
+        return _ENCODER.encode(content).decode()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.user_id = None
+        self.group_name = None
         self.search_id = None
         self.matchmaking_service = None
         self.is_connected = False
 
-    async def connect(self):
+    async def connect(self) -> None:
         """Handle WebSocket connection."""
         user = self.scope["user"]
 
@@ -33,16 +99,16 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
             return
 
         self.user_id = user.id
+        self.group_name = f"user_{self.user_id}"
         self.search_id = None
         self.is_connected = False
         self.matchmaking_service = MatchmakingService()
 
         await self.accept()
 
-        group_name = f"user_{self.user_id}"
-        await self.channel_layer.group_add(group_name, self.channel_name)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
         logger.info(
-            f"User {self.user_id} added to group {group_name} with channel {self.channel_name}"
+            f"User {self.user_id} added to group {self.group_name} with channel {self.channel_name}"
         )
 
         self.is_connected = True
@@ -50,7 +116,7 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
             f"Matchmaking consumer connected for user {self.user_id} - connection state: {self.is_connected}"
         )
 
-    async def disconnect(self, close_code):
+    async def disconnect(self, close_code: int) -> None:
         """Handle WebSocket disconnection."""
         logger.info(
             f"Matchmaking consumer disconnecting for user {self.user_id} with close_code {close_code}"
@@ -66,9 +132,10 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
                         self.user_id, self.search_id
                     )
 
-                group_name = f"user_{self.user_id}"
-                await self.channel_layer.group_discard(group_name, self.channel_name)
-                logger.info(f"User {self.user_id} removed from group {group_name}")
+                await self.channel_layer.group_discard(
+                    self.group_name, self.channel_name
+                )
+                logger.info(f"User {self.user_id} removed from group {self.group_name}")
 
             except Exception as e:
                 logger.error(f"Error during disconnect for user {self.user_id}: {e}")
@@ -78,11 +145,23 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
             f"Matchmaking consumer disconnected for user {self.user_id} - connection state: {self.is_connected}"
         )
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None, **kwargs) -> None:
+        """Decode incoming WebSocket frames, rejecting malformed JSON."""
+        try:
+            await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+        except msgspec.ValidationError:
+            await self.send_json(
+                {"type": "error", "payload": {"reason": "Invalid message format"}}
+            )
+        except msgspec.DecodeError:
+            await self.send_json(
+                {"type": "error", "payload": {"reason": "Invalid JSON format"}}
+            )
+
+    async def receive_json(self, data: MatchmakingMessage, **kwargs) -> None:
         """Handle incoming WebSocket messages."""
         try:
-            data = json.loads(text_data)
-            message_type = data.get("type")
+            message_type = data.type
 
             if message_type != "ping":
                 logger.info(
@@ -90,11 +169,11 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
                 )
 
             if message_type == "find_game":
-                await self.handle_find_game(data.get("payload", {}))
+                await self.handle_find_game(data.payload)
             elif message_type == "cancel_search":
                 await self.handle_cancel_search()
             elif message_type == "ping":
-                await self.send_json({"type": "pong", "payload": {}})
+                await self.send_json(PONG)
             else:
                 await self.send_json(
                     {
@@ -103,17 +182,13 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
                     }
                 )
 
-        except json.JSONDecodeError:
-            await self.send_json(
-                {"type": "error", "payload": {"reason": "Invalid JSON format"}}
-            )
         except Exception as e:
             logger.error(f"Error handling message: {e}")
             await self.send_json(
                 {"type": "error", "payload": {"reason": "Internal server error"}}
             )
 
-    async def handle_find_game(self, payload: dict):
+    async def handle_find_game(self, payload: dict) -> None:
         """Handle find game request."""
         try:
             user_data = await self.get_user_data()
@@ -160,7 +235,7 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
                 {"type": "error", "payload": {"reason": "Failed to start search"}}
             )
 
-    async def handle_cancel_search(self):
+    async def handle_cancel_search(self) -> None:
         """Handle cancel search request."""
         try:
             if self.search_id and self.matchmaking_service:
@@ -196,7 +271,7 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
                 {"type": "error", "payload": {"reason": "Failed to cancel search"}}
             )
 
-    async def try_find_match(self, user_data: dict):
+    async def try_find_match(self, user_data: dict) -> None:
         """Try to find a match for the current user."""
         try:
             if not self.search_id:
@@ -213,7 +288,7 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
 
             logger.info(f"Player {self.user_id} starting match search")
 
-            player_data = {
+            player_data: Dict = {
                 "user_id": self.user_id,
                 "elo": user_data.get("rating", 1200),
                 "games_won": user_data.get("games_won", 0),
@@ -284,41 +359,29 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
 
                     self.search_id = None
 
-                    for uid in [self.user_id, opponent_data["user_id"]]:
-                        logger.info(f"Sending game_found notification to user {uid}")
+                    opponent_id = opponent_data["user_id"]
+                    recipients = (
+                        (self.user_id, self.group_name),
+                        (opponent_id, f"user_{opponent_id}"),
+                    )
+                    message = {
+                        "type": "game_found",
+                        "payload": {
+                            "game": game_data,
+                            "message": "Opponent found! Game starting...",
+                            "game_code": game.code,
+                        },
+                    }
+                    for uid, group_name in recipients:
+                        logger.info(
+                            f"Sending game_found to group {group_name} for game {game.code}"
+                        )
                         try:
-                            group_name = f"user_{uid}"
-                            logger.info(f"Checking if group {group_name} exists")
-
-                            try:
-                                logger.info(
-                                    f"Verifying group membership for {group_name}"
-                                )
-                            except Exception as e:
-                                logger.warning(
-                                    f"Could not verify group membership for {group_name}: {e}"
-                                )
-
-                            message = {
-                                "type": "game_found",
-                                "payload": {
-                                    "game": game_data,
-                                    "message": "Opponent found! Game starting...",
-                                    "game_code": game.code,
-                                },
-                            }
-                            logger.info(
-                                f"Sending message to group {group_name} for game {game.code}: {message}"
-                            )
-
                             await self.channel_layer.group_send(
                                 group_name,
                                 message,
                             )
                             logger.info(f"Successfully sent game_found to user {uid}")
-                            logger.info(
-                                f"Group send completed for {group_name} with message type: {message['type']}"
-                            )
 
                         except Exception as e:
                             logger.error(f"Error in group_send to user {uid}: {e}")
@@ -338,32 +401,30 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error in try_find_match for player {self.user_id}: {e}")
 
-    async def schedule_match_retry(self, user_data: dict):
-        """Schedule a retry to find a match using background task."""
-        import asyncio
-
-        async def retry_task():
-            try:
-                await asyncio.sleep(2)
-
-                if not self.search_id:
-                    logger.info(
-                        f"Search cancelled for user {self.user_id}, skipping retry"
-                    )
-                    return
+    async def schedule_match_retry(self, user_data: dict) -> None:
+        """Queue a delayed match retry on the shared bounded retry workers."""
+        queue = _get_retry_queue()
+        due = asyncio.get_running_loop().time() + MATCH_RETRY_DELAY
+        await queue.put((due, self.user_id, self.search_id, user_data))
 
-                if not self.is_connected:
-                    logger.info(f"User {self.user_id} disconnected, skipping retry")
-                    return
+    async def match_retry(self, event: dict) -> None:
+        """Handle match_retry event dispatched by the retry workers."""
+        payload = event.get("payload", {})
+        try:
+            if not self.search_id or payload.get("search_id") != self.search_id:
+                logger.info(f"Search cancelled for user {self.user_id}, skipping retry")
+                return
 
-                logger.info(
-                    f"Retrying match search for user {self.user_id} with search_id {self.search_id}"
-                )
-                await self.try_find_match(user_data)
-            except Exception as e:
-                logger.error(f"Error in retry task for user {self.user_id}: {e}")
+            if not self.is_connected:
+                logger.info(f"User {self.user_id} disconnected, skipping retry")
+                return
 
-        asyncio.create_task(retry_task())
+            logger.info(
+                f"Retrying match search for user {self.user_id} with search_id {self.search_id}"
+            )
+            await self.try_find_match(payload.get("user_data", {}))
+        except Exception as e:
+            logger.error(f"Error in match retry for user {self.user_id}: {e}")
 
     @database_sync_to_async
     def get_user_data(self) -> Optional[dict]:
@@ -382,10 +443,7 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def serialize_game(self, game) -> dict:
-        """Serialize game data with proper datetime handling."""
-        from django.core.serializers.json import DjangoJSONEncoder
-        import json
-
+        """Serialize the fields clients need to join a matched game."""
         simplified_game = {
             "code": game.code,
             "fen": game.fen,
@@ -411,17 +469,12 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
 
         return simplified_game
 
-    async def game_found(self, event):
+    async def game_found(self, event: dict) -> None:
         """Handle game_found event."""
-        logger.info(f"=== GAME_FOUND EVENT HANDLER ENTERED FOR USER {self.user_id} ===")
         game_code = event.get("payload", {}).get("game_code", "unknown")
         logger.info(
-            f"game_found event received for user {self.user_id} for game {game_code}: {event}"
+            f"game_found event received for user {self.user_id} for game {game_code}"
         )
-        logger.info(
-            f"game_found handler called for user {self.user_id} with channel {self.channel_name}"
-        )
-        logger.info(f"Connection state for user {self.user_id}: {self.is_connected}")
 
         self.search_id = None
         logger.info(f"Search ID cleared for user {self.user_id} for game {game_code}")
@@ -445,18 +498,6 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
                 f"Error sending game_found to user {self.user_id} for game {game_code}: {e}"
             )
             logger.error(f"User {self.user_id} channel: {self.channel_name}")
-            logger.error(f"User {self.user_id} group: user_{self.user_id}")
+            logger.error(f"User {self.user_id} group: {self.group_name}")
             logger.error(f"User {self.user_id} connection state: {self.is_connected}")
             logger.error(f"Event payload: {event.get('payload', {})}")
-
-    async def send_json(self, data: dict):
-        """Send JSON data to the client."""
-        try:
-            logger.info(
-                f"Attempting to send JSON to client for user {self.user_id}: {data}"
-            )
-            await self.send(text_data=json.dumps(data))
-            logger.info(f"Successfully sent JSON to client for user {self.user_id}")
-        except Exception as e:
-            logger.error(f"Error sending JSON to client for user {self.user_id}: {e}")
-            raise
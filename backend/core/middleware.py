@@ -9,12 +9,13 @@ from django.contrib.auth.models import AnonymousUser
 
 logger = logging.getLogger(__name__)
 
+JWT_SIGNING_KEY = settings.SIMPLE_JWT["SIGNING_KEY"]
+JWT_ALGORITHMS = [settings.SIMPLE_JWT.get("ALGORITHM", "HS256")]
+JWT_USER_ID_CLAIM = settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id")
+
 
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        from rest_framework_simplejwt.tokens import UntypedToken
-
         scope["user"] = AnonymousUser()
         try:
             query_string = scope.get("query_string", b"").decode()
@@ -52,16 +53,19 @@ class JWTAuthMiddleware(BaseMiddleware):
 
     def get_user_from_token(self, token):
         from django.contrib.auth import get_user_model
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        from rest_framework_simplejwt.tokens import UntypedToken
 
         User = get_user_model()
         try:
-            validated_token = UntypedToken(token)
-            user_id = validated_token.payload.get("user_id")
-            logger.info(
-                f"JWTAuthMiddleware: Full token payload: {validated_token.payload}"
+            # Tokens are signed locally with a known algorithm and no
+            # blacklist app is installed, so PyJWT can verify them directly.
+            payload = jwt.decode(
+                token,
+                JWT_SIGNING_KEY,
+                algorithms=JWT_ALGORITHMS,
+                options={"verify_aud": False},
             )
+            user_id = payload.get(JWT_USER_ID_CLAIM)
+            logger.info(f"JWTAuthMiddleware: Full token payload: {payload}")
             logger.info(f"JWTAuthMiddleware: Decoded token, user_id: {user_id}")
             if user_id:
                 user = User.objects.get(id=user_id)
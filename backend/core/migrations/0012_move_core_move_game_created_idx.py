@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2025-07-20 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_move_fen_before"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="move",
+            index=models.Index(
+                fields=["game", "-created_at"], name="core_move_game_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2025-07-21 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_move_core_move_game_created_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="quizquestion",
+            index=models.Index(fields=["subject"], name="core_quiz_subject_idx"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2025-07-21 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_quizquestion_core_quiz_subject_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["player_white", "-created_at"],
+                name="core_game_white_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["player_black", "-created_at"],
+                name="core_game_black_created_idx",
+            ),
+        ),
+    ]
@@ -64,6 +64,18 @@ class Game(models.Model):
         blank=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["player_white", "-created_at"],
+                name="core_game_white_created_idx",
+            ),
+            models.Index(
+                fields=["player_black", "-created_at"],
+                name="core_game_black_created_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.code:
             self.code = generate_game_code(random.randint(10, 30))
@@ -92,6 +104,13 @@ class Move(models.Model):
         max_length=100, blank=True, null=True
     )  # FEN before the move
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["game", "-created_at"], name="core_move_game_created_idx"
+            )
+        ]
+
 
 class QuizQuestion(models.Model):
     SUBJECT_CHOICES = [
@@ -113,6 +132,11 @@ class QuizQuestion(models.Model):
     )
     explanation = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["subject"], name="core_quiz_subject_idx"),
+        ]
+
     def __str__(self):
         return f"[{self.subject}] {self.question[:40]}..."
 
@@ -28,11 +28,95 @@ class GameSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def get_analysis(self, obj):
-        if obj.analysis_status == "completed":
-            try:
-                analysis = obj.analysis
-                if analysis:
-                    return {"overall": analysis.overall, "per_move": analysis.per_move}
-            except Exception:
-                pass
+        return _serialize_analysis(obj)
+
+
+def _serialize_analysis(game):
+    if game.analysis_status == "completed":
+        try:
+            analysis = game.analysis
+            if analysis:
+                return {"overall": analysis.overall, "per_move": analysis.per_move}
+        except Exception:
+            pass
+    return None
+
+
+PLAYER_FIELDS = (
+    "id",
+    "username",
+    "rating",
+    "games_played",
+    "games_won",
+    "games_lost",
+    "games_drawn",
+    "quiz_correct",
+    "quiz_attempted",
+    "preferred_subject",
+)
+MOVE_FIELDS = (
+    "id",
+    "uuid",
+    "game_id",
+    "player_id",
+    "from_square",
+    "to_square",
+    "piece",
+    "captured_piece",
+    "move_number",
+    "fen_after",
+    "quiz_required",
+    "quiz_correct",
+    "quiz_data",
+    "created_at",
+    "fen_before",
+)
+
+
+def _isoformat(value):
+    if value is None:
         return None
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def _serialize_player(user):
+    if user is None:
+        return None
+    return {field: getattr(user, field) for field in PLAYER_FIELDS}
+
+
+def serialize_game_fast(game):
+    """Build the game payload for WebSocket broadcasts and the Redis cache.
+
+    Mirrors GameSerializer's output without DRF field introspection. Players
+    carry their public profile fields only; the REST endpoints still return
+    the full GameSerializer representation.
+    """
+    moves = []
+    for move in game.moves.order_by("move_number", "id").values(*MOVE_FIELDS):
+        move["uuid"] = str(move["uuid"])
+        move["game"] = move.pop("game_id")
+        move["player"] = move.pop("player_id")
+        move["created_at"] = _isoformat(move["created_at"])
+        moves.append(move)
+
+    return {
+        "id": game.id,
+        "moves": moves,
+        "player_white": _serialize_player(game.player_white),
+        "player_black": _serialize_player(game.player_black),
+        "analysis": _serialize_analysis(game),
+        "code": game.code,
+        "subjects": game.subjects,
+        "fen": game.fen,
+        "status": game.status,
+        "analysis_status": game.analysis_status,
+        "created_at": _isoformat(game.created_at),
+        "updated_at": _isoformat(game.updated_at),
+        "is_vs_ai": game.is_vs_ai,
+        "ai_difficulty": game.ai_difficulty,
+        "winner": game.winner_id,
+    }
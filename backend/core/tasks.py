@@ -1,47 +1,61 @@
-import asyncio
 import json
 import logging
-import os
-import platform
 from datetime import datetime, timedelta
-from pathlib import Path
-import re
 
 import chess
 import chess.engine
+import orjson
 import redis
 from asgiref.sync import async_to_sync
-from celery import shared_task
+from celery import chord, group, shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
 from channels.layers import get_channel_layer
-from django.conf import settings
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from backend.utils import send_message
 from core.ai import get_ai_move, minimax
 from core.models import Game, GameAnalysis, Move
-from core.serializers import GameSerializer
+from core.serializers import serialize_game_fast
 from core.utils import (
+    STOCKFISH_AVAILABLE,
+    analysis_cache_key,
+    close_engine,
+    dumps_json,
     end_game_and_update_elo,
-    get_redis,
+    get_engine,
     get_sync_redis,
+    is_valid_fen,
     update_fen,
-    update_fen_sync,
 )
 from users.models import CustomUser
 
 logger = logging.getLogger(__name__)
-if platform.system() == "Linux":
-    STOCKFISH_PATH = (
-        settings.BASE_DIR
-        / "stockfish-linux"
-        / "stockfish"
-        / "stockfish-ubuntu-x86-64-avx2"
-    )
-else:
-    STOCKFISH_PATH = (
-        settings.BASE_DIR / "stockfish-win" / "stockfish-windows-x86-64-avx2.exe"
-    )
-redis = get_redis()
+
+GAME_CACHE_TTL = 60 * 60  # seconds
+ANALYSIS_CHUNK_SIZE = 10  # moves per analysis subtask
+# A node budget keeps per-position cost predictable; the depth caps only stop
+# simple positions from searching needlessly deep.
+ANALYSIS_LIMIT = chess.engine.Limit(nodes=200_000, depth=14)
+OPENING_ANALYSIS_LIMIT = chess.engine.Limit(nodes=200_000, depth=10)
+OPENING_MOVES = 10
+
+
+@worker_process_init.connect
+def prewarm_engine(**kwargs):
+    if not STOCKFISH_AVAILABLE:
+        return
+    try:
+        get_engine()
+    except Exception as e:
+        logger.warning(f"Could not prewarm Stockfish engine: {e}")
+
+
+@worker_process_shutdown.connect
+def shutdown_engine(**kwargs):
+    close_engine()
+
 
 QUIZ_PROMPT_MULTI = """
 I need you to generate quiz questions for a chess-based educational game. For each subject in the following list: {Subjects}, generate {N} multiple-choice questions (A-D) suitable for a player of rank {Player_Rank}. Return a JSON object where each key is the subject and the value is a list of questions, each with 'question', 'choices', 'correct', and 'explanation'.
@@ -51,28 +65,37 @@ I need you to generate {N} quiz questions for a chess-based educational game. Th
 """
 
 
+def _loads_lenient(text):
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
 def extract_json_from_text(text):
-    match = re.search(r"({[\s\S]*})", text)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except Exception as e:
-            pass
-    match = re.search(r"(\[[\s\S]*\])", text)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except Exception as e:
-            pass
+    text = text.strip()
+    try:
+        data = orjson.loads(text)
+        if isinstance(data, (dict, list)):
+            return data
+    except orjson.JSONDecodeError:
+        pass
+    # Fall back to the widest {...} then [...] span, e.g. JSON wrapped in
+    # prose or a code fence.
+    for opening, closing in (("{", "}"), ("[", "]")):
+        start = text.find(opening)
+        end = text.rfind(closing)
+        if start != -1 and end > start:
+            try:
+                return _loads_lenient(text[start : end + 1])
+            except Exception:
+                pass
     return None
 
 
 @shared_task(queue="quiz")
 def generate_quizs_in_advance(game_id, N=5, subject_list=None):
-    import json
-
     from backend.utils import send_message
-    from core.utils import get_redis
 
     try:
         game = Game.objects.get(id=game_id)
@@ -113,7 +136,7 @@ def generate_quizs_in_advance(game_id, N=5, subject_list=None):
             )
             redis_key = f"game:{game.code}:quizzes:{subject.lower()}"
             try:
-                quiz_data = json.loads(quiz_content)
+                quiz_data = orjson.loads(quiz_content)
             except Exception as e:
                 logger.error(
                     f"Failed to parse LLM response as JSON: {e}\nResponse: {quiz_content}"
@@ -124,7 +147,7 @@ def generate_quizs_in_advance(game_id, N=5, subject_list=None):
                         f"Could not extract valid JSON from LLM response for subject {subject}."
                     )
             if quiz_data:
-                r.set(redis_key, json.dumps(quiz_data))
+                r.set(redis_key, dumps_json(quiz_data))
                 logger.info(f"Saved quiz questions to Redis key {redis_key}")
                 results[subject] = quiz_data
             else:
@@ -142,7 +165,7 @@ def generate_quizs_in_advance(game_id, N=5, subject_list=None):
                 f"Generated quiz questions for game {game_id}, subjects {subject_list}: {quiz_content}"
             )
             try:
-                quiz_data = json.loads(quiz_content)
+                quiz_data = orjson.loads(quiz_content)
             except Exception as e:
                 logger.error(
                     f"Failed to parse LLM response as JSON: {e}\nResponse: {quiz_content}"
@@ -153,19 +176,23 @@ def generate_quizs_in_advance(game_id, N=5, subject_list=None):
                         f"Could not extract valid JSON from LLM response for subjects {subject_list}."
                     )
                     quiz_data = {}
-            for subject in subject_list:
-                subject_questions = None
-                if isinstance(quiz_data, dict):
-                    subject_questions = quiz_data.get(subject)
-                if not subject_questions:
-                    logger.warning(
-                        f"No questions found for subject {subject} in LLM response."
-                    )
-                else:
-                    redis_key = f"game:{game.code}:quizzes:{subject.lower()}"
-                    r.set(redis_key, json.dumps(subject_questions))
-                    logger.info(f"Saved quiz questions to Redis key {redis_key}")
-                results[subject] = subject_questions
+            with r.pipeline(transaction=False) as pipe:
+                for subject in subject_list:
+                    subject_questions = None
+                    if isinstance(quiz_data, dict):
+                        subject_questions = quiz_data.get(subject)
+                    if not subject_questions:
+                        logger.warning(
+                            f"No questions found for subject {subject} in LLM response."
+                        )
+                    else:
+                        redis_key = f"game:{game.code}:quizzes:{subject.lower()}"
+                        pipe.set(redis_key, dumps_json(subject_questions))
+                    results[subject] = subject_questions
+                saved_keys = pipe.execute()
+            logger.info(
+                f"Saved quiz questions for {len(saved_keys)} subjects of game {game.code} to Redis"
+            )
         return results
     except Exception as e:
         logger.error(f"Error generating quiz questions for game {game_id}: {e}")
@@ -175,27 +202,33 @@ def generate_quizs_in_advance(game_id, N=5, subject_list=None):
 @shared_task
 def update_user_quiz_stats(user_id, correct):
     """Update quiz stats for a user after a quiz attempt."""
-    try:
-        user = CustomUser.objects.get(id=user_id)
-    except CustomUser.DoesNotExist:
+    updated = CustomUser.objects.filter(id=user_id).update(
+        quiz_attempted=F("quiz_attempted") + 1,
+        quiz_correct=F("quiz_correct") + (1 if correct else 0),
+    )
+    if not updated:
         logger.error(f"User not found for quiz stats update: {user_id}")
         return
-    user.quiz_attempted += 1
-    if correct:
-        user.quiz_correct += 1
-    user.save()
-    logger.info(
-        f"Updated quiz stats for user {user_id}: attempted={user.quiz_attempted}, correct={user.quiz_correct}"
-    )
+    logger.info(f"Updated quiz stats for user {user_id}: correct={correct}")
+
+
+def cache_game_state(r, game_code, fen, game_data):
+    """Write a game's FEN and serialized state to Redis in one round trip."""
+    with r.pipeline(transaction=False) as pipe:
+        pipe.set(f"game:{game_code}:fen", fen)
+        pipe.set(f"game:{game_code}:data", dumps_json(game_data), ex=GAME_CACHE_TTL)
+        pipe.execute()
 
 
 @shared_task
 def update_game_cache_and_broadcast_task(game_id, game_code):
     try:
         r = get_sync_redis()
-        game = Game.objects.get(id=game_id)
-        game_data = GameSerializer(game).data
-        r.set(f"game:{game_code}:data", json.dumps(game_data))
+        game = Game.objects.select_related("player_white", "player_black").get(
+            id=game_id
+        )
+        game_data = serialize_game_fast(game)
+        cache_game_state(r, game_code, game.fen, game_data)
         channel_layer = get_channel_layer()
         room_group_name = f"game_{game_code}"
         async_to_sync(channel_layer.group_send)(
@@ -215,7 +248,10 @@ def run_ai_move_task(game_id):
     """Run the AI move for a vs AI game, update state, and broadcast."""
     logger.info(f"AI move task triggered for game_id={game_id}")
     try:
-        game = Game.objects.get(id=game_id)
+        # The broadcast serializes both players, so fetch them in the same query.
+        game = Game.objects.select_related("player_white", "player_black").get(
+            id=game_id
+        )
     except Game.DoesNotExist:
         logger.error(f"Game not found for AI move: {game_id}")
         return
@@ -235,249 +271,271 @@ def run_ai_move_task(game_id):
         else:
             ai_elo = 1400
         try:
-            with chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH) as engine:
-                engine.configure({"UCI_LimitStrength": True, "UCI_Elo": ai_elo})
-                result = engine.play(board, chess.engine.Limit(time=0.5))
-                move = result.move
-                if move not in board.legal_moves:
-                    logger.warning(
-                        f"AI move {move.uci()} not legal for game_id={game_id}, fen={fen}. Picking random legal move."
+            engine = get_engine()
+            result = engine.play(
+                board,
+                chess.engine.Limit(time=0.5),
+                game=game.id,
+                options={"UCI_LimitStrength": True, "UCI_Elo": ai_elo},
+            )
+            move = result.move
+            if move not in board.legal_moves:
+                logger.warning(
+                    f"AI move {move.uci()} not legal for game_id={game_id}, fen={fen}. Picking random legal move."
+                )
+                legal_moves = list(board.legal_moves)
+                if not legal_moves:
+                    logger.error(
+                        f"No legal moves available for game_id={game_id}, fen={fen}"
                     )
-                    legal_moves = list(board.legal_moves)
-                    if not legal_moves:
-                        logger.error(
-                            f"No legal moves available for game_id={game_id}, fen={fen}"
-                        )
-                        return
-                    move = legal_moves[0]
+                    return
+                move = legal_moves[0]
         except Exception as e:
             logger.error(f"Error running Stockfish for AI move in game {game_id}: {e}")
+            close_engine()
             return
-    piece = (
-        board.piece_at(move.from_square).symbol().lower()
-        if board.piece_at(move.from_square)
-        else ""
-    )
-    captured_piece = (
-        board.piece_at(move.to_square).symbol().lower()
-        if board.piece_at(move.to_square)
-        else ""
-    )
+    from_square = chess.SQUARE_NAMES[move.from_square]
+    to_square = chess.SQUARE_NAMES[move.to_square]
+    moved = board.piece_at(move.from_square)
+    piece = moved.symbol().lower() if moved else ""
+    captured = board.piece_at(move.to_square)
+    captured_piece = captured.symbol().lower() if captured else ""
+    # Every applied move is stored, so the move number follows from the
+    # position itself and needs no COUNT(*) over the game's moves.
+    move_number = 2 * (board.fullmove_number - 1) + int(board.turn == chess.BLACK) + 1
     board.push(move)
     new_fen = board.fen()
-    game_ended = False
     game_end_payload = None
 
-    if board.is_checkmate():
-        winner = "white" if not board.turn else "black"
-        game.status = "finished"
-        game.result = f"{winner}_win_by_checkmate"
-        game.save()
-        game_ended = True
-        game_end_payload = {"reason": "checkmate", "winner": winner}
-        logger.info(f"Game ended by checkmate after AI move. Winner: {winner}")
-        analyze_game_task.delay(game.id)
-    elif (
-        board.is_stalemate()
-        or board.is_insufficient_material()
-        or board.can_claim_fifty_moves()
-        or board.can_claim_threefold_repetition()
-    ):
+    if not is_valid_fen(new_fen):
+        logger.error(f"Invalid FEN after AI move in game {game_id}: {new_fen}")
+        return
+    game.fen = new_fen
+
+    outcome = board.outcome(claim_draw=True)
+    if outcome is not None:
         game.status = "finished"
-        game.result = "draw"
-        game.save()
-        game_ended = True
-        game_end_payload = {"reason": "draw", "winner": None}
-        logger.info(f"Game ended in draw after AI move.")
-        analyze_game_task.delay(game.id)
+        if outcome.termination == chess.Termination.CHECKMATE:
+            winner = "white" if outcome.winner == chess.WHITE else "black"
+            game.result = f"{winner}_win_by_checkmate"
+            game_end_payload = {"reason": "checkmate", "winner": winner}
+            logger.info(f"Game ended by checkmate after AI move. Winner: {winner}")
+        else:
+            game.result = "draw"
+            game_end_payload = {"reason": "draw", "winner": None}
+            logger.info(f"Game ended in draw after AI move.")
 
-    try:
-        try:
-            asyncio.get_running_loop()
-        except RuntimeError:
-            asyncio.set_event_loop(asyncio.new_event_loop())
-        update_fen_sync(game, new_fen)
-    except Exception as e:
-        logger.error(f"Error updating FEN for AI move in game {game_id}: {e}")
-        return
+    # FEN and status go out in one UPDATE of just the touched columns.
+    game.save(update_fields=["fen", "status", "updated_at"])
     move_obj = Move.objects.create(
         game=game,
         player=None,  # AI has no user
-        from_square=chess.square_name(move.from_square),
-        to_square=chess.square_name(move.to_square),
+        from_square=from_square,
+        to_square=to_square,
         piece=piece,
         captured_piece=captured_piece,
-        move_number=game.moves.count() + 1,
+        move_number=move_number,
         fen_after=new_fen,
         quiz_required=False,
         quiz_correct=None,
     )
+    if game_end_payload:
+        analyze_game_task.delay(game.id)
     try:
+        game_data = serialize_game_fast(game)
+        cache_game_state(get_sync_redis(), game.code, new_fen, game_data)
         channel_layer = get_channel_layer()
-        room_group_name = f"game_{game.code}"
+        # One channel-layer event carries the move, the optional game end and
+        # the refreshed game state; consumers fan it out as separate frames.
         async_to_sync(channel_layer.group_send)(
-            room_group_name,
+            f"game_{game.code}",
             {
-                "type": "move",
+                "type": "move_batch",
                 "payload": {
-                    "from_square": chess.square_name(move.from_square),
-                    "to_square": chess.square_name(move.to_square),
-                    "piece": piece,
-                    "move_number": move_obj.move_number,
-                    "fen_after": new_fen,
-                    "captured_piece": captured_piece,
-                    "uuid": str(move_obj.uuid),
+                    "move": {
+                        "from_square": from_square,
+                        "to_square": to_square,
+                        "piece": piece,
+                        "move_number": move_obj.move_number,
+                        "fen_after": new_fen,
+                        "captured_piece": captured_piece,
+                        "uuid": str(move_obj.uuid),
+                    },
+                    "game_over": game_end_payload,
+                    "game": game_data,
                 },
             },
         )
-        if game_ended and game_end_payload:
-            async_to_sync(channel_layer.group_send)(
-                room_group_name,
-                {
-                    "type": "game_over",
-                    "payload": game_end_payload,
-                },
-            )
-
         logger.info(f"AI move task completed for game_id={game_id}, move={move}")
-        update_game_cache_and_broadcast_task.delay(game.id, game.code)
     except Exception as e:
         logger.error(f"Error broadcasting AI move for game {game_id}: {e}")
 
 
+def _analyse_position(engine, board, played_move, game_id):
+    """Search one position and grade the played move against the engine's best."""
+    limit = (
+        OPENING_ANALYSIS_LIMIT
+        if board.fullmove_number <= OPENING_MOVES
+        else ANALYSIS_LIMIT
+    )
+    info = engine.analyse(board, limit, game=game_id)
+    pv = info.get("pv", [])
+    best_move = pv[0] if pv else None
+    score = info.get("score")
+    mover = board.turn
+    evaluation = score.white().score(mate_score=10000) if score is not None else None
+
+    comment = "OK"
+    if best_move:
+        if played_move == best_move:
+            comment = "Best"
+        else:
+            # The search above already scores the best line, so only the
+            # position after the played move needs one.
+            best_eval = (
+                score.pov(mover).score(mate_score=10000) if score is not None else None
+            )
+            try:
+                board.push(played_move)
+                try:
+                    played_info = engine.analyse(board, limit, game=game_id)
+                finally:
+                    board.pop()
+                played_eval = played_info["score"].pov(mover).score(mate_score=10000)
+            except chess.engine.EngineTerminatedError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"Error analysing played move {played_move} for FEN {board.fen()}: {e}"
+                )
+                played_eval = None
+            if best_eval is not None and played_eval is not None:
+                diff = best_eval - played_eval
+                if diff >= 100:
+                    comment = "Blunder"
+                elif diff >= 30:
+                    comment = "Inaccuracy"
+
+    return {
+        "played": played_move.uci(),
+        "best": best_move.uci() if best_move else None,
+        "evaluation": evaluation,
+        "comment": comment,
+    }
+
+
 @shared_task(queue="analysis")
 def analyze_game_task(game_id):
-    """Analyze a finished game using Stockfish, storing overall and per-move analysis."""
+    """Analyze a finished game using Stockfish, storing overall and per-move analysis.
+
+    Positions are replayed here and handed out in chunks to
+    analyze_moves_chunk_task; finalize_game_analysis_task aggregates them.
+    """
     logger.info(f"Starting analysis for game {game_id}")
     try:
-        game = Game.objects.get(id=game_id)
+        game = Game.objects.only("id", "code", "analysis_status").get(id=game_id)
         game.analysis_status = "in_progress"
         game.save(update_fields=["analysis_status"])
     except Game.DoesNotExist:
         logger.error(f"Game not found for analysis: {game_id}")
         return
 
-    moves = list(game.moves.order_by("move_number"))
-    logger.info(f"Found {len(moves)} moves to analyze for game {game_id}")
+    moves = (
+        game.moves.order_by("move_number")
+        .only("from_square", "to_square", "fen_after", "move_number")
+        .iterator(chunk_size=64)
+    )
+
+    total_moves = 0
+    positions = []
+    board = chess.Board()
+    previous_fen = None
+    for move_obj in moves:
+        total_moves += 1
+        move_uci = move_obj.from_square + move_obj.to_square
+        try:
+            played_move = chess.Move.from_uci(move_uci)
+        except Exception as e:
+            logger.error(f"Invalid move UCI {move_uci}: {e}")
+            previous_fen = move_obj.fen_after
+            continue
 
-    total_moves = len(moves)
+        # The board is advanced move by move; only re-read the stored FEN
+        # when the recorded move no longer fits that position.
+        if played_move not in board.legal_moves and previous_fen:
+            try:
+                board = chess.Board(previous_fen)
+            except ValueError as e:
+                logger.error(
+                    f"Invalid FEN from previous move: {previous_fen}, keeping replayed position. Error: {e}"
+                )
+        positions.append((move_obj.move_number, board.fen(), move_uci))
+        if played_move in board.legal_moves:
+            board.push(played_move)
+        previous_fen = move_obj.fen_after
+
+    logger.info(f"Found {total_moves} moves to analyze for game {game_id}")
     if total_moves == 0:
         logger.warning(f"No moves found for game {game_id}, skipping analysis")
         game.analysis_status = "failed"
         game.save(update_fields=["analysis_status"])
         return
 
-    per_move = []
-    blunders = 0
-    inaccuracies = 0
-    best_moves = 0
+    if not positions:
+        finalize_game_analysis_task([], game_id, total_moves)
+        return
 
+    chunks = [
+        positions[i : i + ANALYSIS_CHUNK_SIZE]
+        for i in range(0, len(positions), ANALYSIS_CHUNK_SIZE)
+    ]
+    chord(analyze_moves_chunk_task.s(game_id, chunk) for chunk in chunks)(
+        finalize_game_analysis_task.s(game_id, total_moves)
+    )
+    logger.info(f"Queued {len(chunks)} analysis chunks for game {game_id}")
+
+
+@shared_task(queue="analysis")
+def analyze_moves_chunk_task(game_id, positions):
+    """Analyze a slice of a game's positions; returns None if the engine failed."""
     try:
-        with chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH) as engine:
-            engine.configure({"Threads": 1, "Hash": 128})
-            board = chess.Board()
-            for i, move_obj in enumerate(moves):
-                try:
-                    if i > 0 and moves[i - 1].fen_after:
-                        try:
-                            board = chess.Board(moves[i - 1].fen_after)
-                        except Exception as e:
-                            logger.error(
-                                f"Invalid FEN from previous move: {moves[i-1].fen_after}, using reconstructed position. Error: {e}"
-                            )
-                            board = chess.Board()
-                            for j in range(i):
-                                try:
-                                    prev_move = chess.Move.from_uci(
-                                        moves[j].from_square + moves[j].to_square
-                                    )
-                                    board.push(prev_move)
-                                except Exception as e:
-                                    logger.error(f"Error reconstructing move {j}: {e}")
-                                    break
-                    else:
-                        board = chess.Board()
+        engine = get_engine()
+    except Exception as e:
+        logger.error(f"Could not start Stockfish for game {game_id}: {e}")
+        return None
 
-                    logger.debug(
-                        f"Analyzing move {i+1}/{total_moves}: {move_obj.from_square}{move_obj.to_square} at FEN: {board.fen()}"
-                    )
-                    info = engine.analyse(board, chess.engine.Limit(depth=12))
-                    pv = info.get("pv", [])
-                    best_move = pv[0] if pv else None
-                    evaluation = (
-                        info["score"].white().score(mate_score=10000)
-                        if "score" in info
-                        else None
-                    )
-                    try:
-                        played_move = chess.Move.from_uci(
-                            move_obj.from_square + move_obj.to_square
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Invalid move UCI {move_obj.from_square + move_obj.to_square}: {e}"
-                        )
-                        continue
-
-                    comment = "OK"
-                    if best_move:
-                        try:
-                            if played_move == best_move:
-                                comment = "Best"
-                                best_moves += 1
-                            else:
-                                try:
-                                    board.push(best_move)
-                                    best_eval = (
-                                        engine.analyse(
-                                            board, chess.engine.Limit(depth=12)
-                                        )["score"]
-                                        .white()
-                                        .score(mate_score=10000)
-                                    )
-                                    board.pop()
-                                except Exception as e:
-                                    logger.error(
-                                        f"Error pushing best_move {best_move} for FEN {board.fen()}: {e}"
-                                    )
-                                    best_eval = None
-                                if best_eval is not None and evaluation is not None:
-                                    diff = best_eval - evaluation
-                                    if diff >= 100:
-                                        comment = "Blunder"
-                                        blunders += 1
-                                    elif diff >= 30:
-                                        comment = "Inaccuracy"
-                                        inaccuracies += 1
-                                    else:
-                                        comment = "OK"
-                        except chess.IllegalMoveError as e:
-                            logger.error(
-                                f"Illegal best_move {best_move} for FEN {board.fen()}: {e}"
-                            )
-                            comment = "Illegal best move"
-
-                    per_move.append(
-                        {
-                            "move_number": move_obj.move_number,
-                            "played": played_move.uci(),
-                            "best": best_move.uci() if best_move else None,
-                            "evaluation": evaluation,
-                            "comment": comment,
-                        }
-                    )
+    per_move = []
+    for move_number, fen, move_uci in positions:
+        try:
+            entry = _analyse_position(
+                engine, chess.Board(fen), chess.Move.from_uci(move_uci), game_id
+            )
+        except chess.engine.EngineTerminatedError as e:
+            logger.error(f"Stockfish terminated while analyzing game {game_id}: {e}")
+            close_engine()
+            return None
+        except Exception as move_exc:
+            logger.error(
+                f"Error analyzing move {move_number} in game {game_id}: {move_exc}"
+            )
+            continue
+        per_move.append({"move_number": move_number, **entry})
+    return per_move
 
-                except Exception as move_exc:
-                    logger.error(
-                        f"Error analyzing move {move_obj.move_number} in game {game_id}: {move_exc}"
-                    )
-                    continue
 
-    except Exception as e:
-        logger.error(f"Game analysis failed for game {game_id}: {e}")
-        game.analysis_status = "failed"
-        game.save(update_fields=["analysis_status"])
+@shared_task(queue="analysis")
+def finalize_game_analysis_task(chunk_results, game_id, total_moves):
+    """Combine chunk results into the game's overall and per-move analysis."""
+    if any(chunk is None for chunk in chunk_results):
+        logger.error(f"Game analysis failed for game {game_id}")
+        Game.objects.filter(id=game_id).update(analysis_status="failed")
         return
+
+    per_move = [entry for chunk in chunk_results for entry in chunk]
+    comments = [entry["comment"] for entry in per_move]
+    best_moves = comments.count("Best")
+    blunders = comments.count("Blunder")
+    inaccuracies = comments.count("Inaccuracy")
     accuracy_score = (
         (
             best_moves * 1.0
@@ -504,16 +562,22 @@ def analyze_game_task(game_id):
 
     try:
         GameAnalysis.objects.update_or_create(
-            game=game,
+            game_id=game_id,
             defaults={"overall": overall, "per_move": per_move},
         )
-        game.analysis_status = "completed"
-        game.save(update_fields=["analysis_status"])
+        Game.objects.filter(id=game_id).update(analysis_status="completed")
         logger.info(f"Analysis complete for game {game_id}")
     except Exception as e:
         logger.error(f"Error saving analysis for game {game_id}: {e}")
-        game.analysis_status = "failed"
-        game.save(update_fields=["analysis_status"])
+        Game.objects.filter(id=game_id).update(analysis_status="failed")
+        return
+
+    game_code = Game.objects.filter(id=game_id).values_list("code", flat=True).first()
+    if game_code:
+        try:
+            get_sync_redis().delete(analysis_cache_key(game_code))
+        except redis.RedisError as e:
+            logger.warning(f"Could not drop cached analysis for game {game_id}: {e}")
 
 
 @shared_task(queue="maintenance")
@@ -550,29 +614,32 @@ def cleanup_stale_games():
     waiting_games.delete()
     logger.info(f"Deleted {count_waiting} waiting games older than 30 minutes.")
     active_cutoff = now - timedelta(hours=2)
-    active_games = Game.objects.filter(status="active")
+    last_moves = Move.objects.filter(game=OuterRef("pk")).order_by("-created_at")
+    active_games = (
+        Game.objects.filter(status="active")
+        .annotate(
+            last_move_at=Coalesce(Max("moves__created_at"), "created_at"),
+            last_move_player_id=Subquery(last_moves.values("player_id")[:1]),
+        )
+        .filter(last_move_at__lt=active_cutoff)
+        .select_related("player_white", "player_black")
+    )
     ended = 0
     for game in active_games:
-        last_move = game.moves.order_by("-created_at").first()
-        if last_move:
-            last_move_time = last_move.created_at
+        last_player_id = game.last_move_player_id
+        if last_player_id is None:
+            winner = None
+        elif last_player_id == game.player_white_id:
+            winner = "white"
+        elif last_player_id == game.player_black_id:
+            winner = "black"
         else:
-            last_move_time = game.created_at
-        if last_move_time < active_cutoff:
-            if last_move and last_move.player:
-                if last_move.player == game.player_white:
-                    winner = "white"
-                elif last_move.player == game.player_black:
-                    winner = "black"
-                else:
-                    winner = None
-            else:
-                winner = None
-            if winner:
-                end_game_and_update_elo(game, winner=winner, draw=False)
-            else:
-                end_game_and_update_elo(game, winner=None, draw=True)
-            ended += 1
+            winner = None
+        if winner:
+            end_game_and_update_elo(game, winner=winner, draw=False)
+        else:
+            end_game_and_update_elo(game, winner=None, draw=True)
+        ended += 1
     logger.info(f"Ended {ended} active games with no move in 2 hours.")
 
 
@@ -580,22 +647,17 @@ def cleanup_stale_games():
 def queue_unanalyzed_games():
     """Find all finished games with analysis_status 'pending' or 'failed' and queue them for analysis."""
     logger.info("Checking for unanalyzed finished games...")
-    games = Game.objects.filter(
-        status="finished", analysis_status__in=["pending", "failed"]
+    game_ids = list(
+        Game.objects.filter(
+            status="finished", analysis_status__in=["pending", "failed"]
+        ).values_list("id", flat=True)
     )
-    game_count = games.count()
     logger.info(
-        f"Found {game_count} finished games with pending/failed analysis status"
+        f"Found {len(game_ids)} finished games with pending/failed analysis status"
     )
+    if not game_ids:
+        return
 
-    queued_count = 0
-    for game in games:
-        logger.info(
-            f"Queuing analysis for game {game.id} (status={game.status}, analysis_status={game.analysis_status})"
-        )
-        game.analysis_status = "in_progress"
-        game.save(update_fields=["analysis_status"])
-        analyze_game_task.delay(game.id)
-        queued_count += 1
-
-    logger.info(f"Queued {queued_count} games for analysis.")
+    Game.objects.filter(id__in=game_ids).update(analysis_status="in_progress")
+    group(analyze_game_task.s(game_id) for game_id in game_ids).apply_async()
+    logger.info(f"Queued {len(game_ids)} games for analysis.")
@@ -1,14 +1,12 @@
-import asyncio
 import json
 import logging
-from unittest.mock import patch
 
 import pytest
+from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
 from channels.testing import ChannelsLiveServerTestCase, WebsocketCommunicator
 from django.conf import settings
-from django.db import transaction
-from django.test import Client, TestCase, TransactionTestCase
+from django.test import Client, TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
@@ -17,48 +15,54 @@ from rest_framework_simplejwt.tokens import AccessToken
 from backend.asgi import application
 from users.models import CustomUser
 
-from .consumers import get_quiz_question, get_redis
-from .models import Game, Move, QuizQuestion
+from . import tasks
+from .consumers import get_quiz_question
+from .models import Game, GameAnalysis, Move, QuizQuestion
 from .tasks import generate_quizs_in_advance
+from .utils import analysis_cache_key, get_sync_redis
 
 print("TEST DB:", settings.DATABASES)
 
 
-class CoreAPITests(TransactionTestCase):
+def _noop_delay(*args, **kwargs):
+    return None
+
+
+def stub_task_delays(testcase):
+    """Swap the Celery .delay entry points for no-ops for one test."""
+    for task in (
+        tasks.generate_quizs_in_advance,
+        tasks.analyze_game_task,
+        tasks.run_ai_move_task,
+    ):
+        testcase.addCleanup(setattr, task, "delay", task.delay)
+        task.delay = _noop_delay
+
+
+class CoreAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = CustomUser.objects.create_user(username="player1", password="pass1")
+        cls.user2 = CustomUser.objects.create_user(username="player2", password="pass2")
+        cls.user3 = CustomUser.objects.create_user(
+            username="spectator", password="spectatorpass"
+        )
+        cls.quiz = QuizQuestion.objects.create(
+            subject="Math",
+            question="2+2=?",
+            option_a="3",
+            option_b="4",
+            option_c="5",
+            option_d="6",
+            correct_option="B",
+            explanation="2+2=4",
+        )
+
     def setUp(self):
-        patcher1 = patch("core.tasks.generate_quizs_in_advance.delay", autospec=True)
-        patcher2 = patch("core.tasks.analyze_game_task.delay", autospec=True)
-        patcher3 = patch("core.tasks.run_ai_move_task.delay", autospec=True)
-        self.mock_generate_quizs = patcher1.start()
-        self.mock_analyze_game = patcher2.start()
-        self.mock_run_ai_move = patcher3.start()
-        self.addCleanup(patcher1.stop)
-        self.addCleanup(patcher2.stop)
-        self.addCleanup(patcher3.stop)
-        with transaction.atomic():
-            CustomUser.objects.all().delete()
-            self.user1 = CustomUser.objects.create_user(
-                username="player1", password="pass1"
-            )
-            self.user2 = CustomUser.objects.create_user(
-                username="player2", password="pass2"
-            )
-            self.user3 = CustomUser.objects.create_user(
-                username="spectator", password="spectatorpass"
-            )
-            self.quiz = QuizQuestion.objects.create(
-                subject="Math",
-                question="2+2=?",
-                option_a="3",
-                option_b="4",
-                option_c="5",
-                option_d="6",
-                correct_option="B",
-                explanation="2+2=4",
-            )
-            self.game_url = reverse("game-create-join")
-            self.quiz_url = reverse("quiz-question")
-            self.client = Client()
+        stub_task_delays(self)
+        self.game_url = reverse("game-create-join")
+        self.quiz_url = reverse("quiz-question")
+        self.client = Client()
 
     def authenticate(self, user):
         login = self.client.post(
@@ -72,7 +76,7 @@ class CoreAPITests(TransactionTestCase):
                 ),
             },
         )
-        token = login.json()["access"]
+        token = login.data["access"]
         self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
 
     @pytest.mark.asyncio
@@ -118,6 +122,27 @@ class CoreAPITests(TransactionTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data["correct"])
 
+    def test_game_analysis_retrieval(self):
+        self.authenticate(self.user1)
+        game = Game.objects.create(
+            player_white=self.user1,
+            player_black=self.user2,
+            status="finished",
+            analysis_status="completed",
+        )
+        per_move = [{"move_number": 1, "comment": "Best"}]
+        GameAnalysis.objects.create(
+            game=game, overall={"accuracy": 1.0}, per_move=per_move
+        )
+        get_sync_redis().delete(analysis_cache_key(game.code))
+        analysis_url = reverse("game-analysis", args=[game.code])
+        for _ in range(2):  # database, then Redis
+            response = self.client.get(analysis_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertEqual(data["overall"], {"accuracy": 1.0})
+            self.assertEqual(data["per_move"], per_move)
+
     def test_ai_game_creation(self):
         self.authenticate(self.user1)
         response = self.client.post(
@@ -126,7 +151,7 @@ class CoreAPITests(TransactionTestCase):
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         self.assertTrue(data["is_vs_ai"])
         self.assertEqual(data["ai_difficulty"], "normal")
         game = Game.objects.get(code=data["code"])
@@ -141,46 +166,38 @@ class CoreAPITests(TransactionTestCase):
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.data
         self.assertFalse(data["is_vs_ai"])
         self.assertEqual(data["ai_difficulty"], "")
 
     def tearDown(self):
-        with transaction.atomic():
-            self.client.logout()
+        self.client.logout()
 
 
 class QuizGenerationTests(TestCase):
-    def setUp(self):
-        patcher1 = patch("core.tasks.generate_quizs_in_advance.delay", autospec=True)
-        patcher2 = patch("core.tasks.analyze_game_task.delay", autospec=True)
-        patcher3 = patch("core.tasks.run_ai_move_task.delay", autospec=True)
-        self.mock_generate_quizs = patcher1.start()
-        self.mock_analyze_game = patcher2.start()
-        self.mock_run_ai_move = patcher3.start()
-        self.addCleanup(patcher1.stop)
-        self.addCleanup(patcher2.stop)
-        self.addCleanup(patcher3.stop)
-        self.user = CustomUser.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
             username="testuser", password="testpass"
         )
-        self.game = Game.objects.create(
-            player_white=self.user, subjects=["Math", "Science"], status="active"
+        cls.game = Game.objects.create(
+            player_white=cls.user, subjects=["Math", "Science"], status="active"
         )
+
+    def setUp(self):
+        stub_task_delays(self)
         self.subjects = ["Math", "Science"]
         self.N = 3
-        redis = get_redis()
-        for subject in self.subjects:
-            key = f"game:{self.game.code}:quizzes:{subject}"
-            asyncio.get_event_loop().run_until_complete(redis.delete(key))
+        self.keys = [
+            f"game:{self.game.code}:quizzes:{subject.lower()}"
+            for subject in self.subjects
+        ]
+        get_sync_redis().delete(*self.keys)
 
     def test_generate_and_fetch_quizzes(self):
         result = generate_quizs_in_advance(self.game.id, self.N, self.subjects)
         self.assertIsInstance(result, dict)
-        redis = get_redis()
-        for subject in self.subjects:
-            key = f"game:{self.game.code}:quizzes:{subject}"
-            questions_json = asyncio.get_event_loop().run_until_complete(redis.get(key))
+        for questions_json in get_sync_redis().mget(self.keys):
             self.assertIsNotNone(questions_json)
             questions = json.loads(questions_json)
             self.assertIsInstance(questions, list)
@@ -194,9 +211,7 @@ class QuizGenerationTests(TestCase):
     def test_random_question_fetch(self):
         generate_quizs_in_advance(self.game.id, self.N, self.subjects)
         for subject in self.subjects:
-            question = asyncio.get_event_loop().run_until_complete(
-                get_quiz_question(self.game, subject)
-            )
+            question = async_to_sync(get_quiz_question)(self.game, subject)
             self.assertIn("question", question)
             self.assertIn("choices", question)
             self.assertIn("correct", question)
@@ -24,20 +24,28 @@ from .models import Game, Move, QuizQuestion
 @pytest.mark.asyncio
 class GameWebSocketTests(ChannelsLiveServerTestCase):
     serve_static = True
+    _token_cache = {}
 
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
         with transaction.atomic():
-            cls.user1, _ = CustomUser.objects.get_or_create(
-                username="player1", defaults={"password": "pass1"}
-            )
-            cls.user2, _ = CustomUser.objects.get_or_create(
-                username="player2", defaults={"password": "pass2"}
-            )
-            cls.user3, _ = CustomUser.objects.get_or_create(
-                username="spectator", defaults={"password": "spectatorpass"}
+            credentials = {
+                "player1": "pass1",
+                "player2": "pass2",
+                "spectator": "spectatorpass",
+            }
+            CustomUser.objects.bulk_create(
+                [
+                    CustomUser(username=username, password=password)
+                    for username, password in credentials.items()
+                ],
+                ignore_conflicts=True,
             )
+            users = CustomUser.objects.in_bulk(list(credentials), field_name="username")
+            cls.user1 = users["player1"]
+            cls.user2 = users["player2"]
+            cls.user3 = users["spectator"]
             cls.quiz, _ = QuizQuestion.objects.get_or_create(
                 subject="Math",
                 question="2+2=?",
@@ -57,6 +65,7 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
 
     @classmethod
     def tearDownClass(cls):
+        cls._token_cache.clear()
         super().tearDownClass()
 
     @database_sync_to_async
@@ -64,7 +73,10 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
         return CustomUser.objects.get(username=username)
 
     async def get_token(self, user):
-        return str(AccessToken.for_user(user))
+        token = self._token_cache.get(user.pk)
+        if token is None:
+            token = self._token_cache[user.pk] = str(AccessToken.for_user(user))
+        return token
 
     async def ws_connect(self, user, code):
         token = await self.get_token(user)
@@ -94,24 +106,27 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
     def get_msg_type(self, msg):
         return msg.get("type")
 
-    async def ensure_test_game(self):
-        from .models import CustomUser, Game
-
+    @database_sync_to_async
+    def ensure_test_game(self):
+        # ChannelsLiveServerTestCase flushes the tables after every test, so
+        # the setUpClass rows cannot simply be cached; recreate them in one
+        # thread hop and one transaction instead of three separate calls.
         code = self.__class__.game.code
-        user1, _ = await database_sync_to_async(CustomUser.objects.get_or_create)(
-            username="player1", defaults={"password": "pass1"}
-        )
-        user2, _ = await database_sync_to_async(CustomUser.objects.get_or_create)(
-            username="player2", defaults={"password": "pass2"}
-        )
-        game, _ = await database_sync_to_async(Game.objects.get_or_create)(
-            code=code,
-            defaults={
-                "player_white": user1,
-                "player_black": user2,
-                "subjects": ["Math", "Science"],
-            },
-        )
+        with transaction.atomic():
+            user1, _ = CustomUser.objects.get_or_create(
+                username="player1", defaults={"password": "pass1"}
+            )
+            user2, _ = CustomUser.objects.get_or_create(
+                username="player2", defaults={"password": "pass2"}
+            )
+            game, _ = Game.objects.get_or_create(
+                code=code,
+                defaults={
+                    "player_white": user1,
+                    "player_black": user2,
+                    "subjects": ["Math", "Science"],
+                },
+            )
         return user1, user2, game
 
     async def test_move_and_quiz_flow(self):
@@ -119,9 +134,11 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
         user1, user2, game = await self.ensure_test_game()
         code = game.code
         try:
-            comm1 = await self.ws_connect(user1, code)
-            comm2 = await self.ws_connect(user2, code)
-            comm3 = await self.ws_connect(self.__class__.user3, code)
+            comm1, comm2, comm3 = await asyncio.gather(
+                self.ws_connect(user1, code),
+                self.ws_connect(user2, code),
+                self.ws_connect(self.__class__.user3, code),
+            )
             await comm1.send_json_to(
                 {
                     "type": "move",
@@ -213,33 +230,31 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
         except Exception as e:
             print(e)
         finally:
-            await self.safe_disconnect(comm1)
-            await self.safe_disconnect(comm2)
-            await self.safe_disconnect(comm3)
+            await self.safe_disconnect(comm1, comm2, comm3)
 
     async def wait_for_message_type(self, communicator, expected_type, timeout=5):
-        end_time = asyncio.get_event_loop().time() + timeout
-        while True:
-            remaining = end_time - asyncio.get_event_loop().time()
-            if remaining <= 0:
-                self.fail(f"Timed out waiting for message type: {expected_type}")
-            msg = await asyncio.wait_for(
-                communicator.receive_json_from(), timeout=remaining
-            )
-            print(f"[wait_for_message_type] Received: {msg}")
-            msg_type = self.get_msg_type(msg)
-            if msg_type is None:
-                print(
-                    f"[wait_for_message_type] WARNING: Message missing 'type' and 'message' keys: {msg}"
-                )
-            if msg_type == expected_type:
-                return msg
+        """Return the next message of expected_type, or the next message at all if None."""
+
+        async def drain():
+            while True:
+                # The outer wait_for owns the deadline; lift the
+                # communicator's own one-second default.
+                msg = await communicator.receive_json_from(timeout=timeout)
+                print(f"[wait_for_message_type] Received: {msg}")
+                if expected_type is None or self.get_msg_type(msg) == expected_type:
+                    return msg
+
+        try:
+            return await asyncio.wait_for(drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.fail(f"Timed out waiting for message type: {expected_type}")
 
     async def test_game_end_by_checkmate(self):
         user1, user2, game = await self.ensure_test_game()
         code = game.code
-        comm1 = await self.ws_connect(user1, code)
-        comm2 = await self.ws_connect(user2, code)
+        comm1, comm2 = await asyncio.gather(
+            self.ws_connect(user1, code), self.ws_connect(user2, code)
+        )
         try:
             pre_checkmate_fen = "7k/5Q2/6K1/8/8/8/8/8 w - - 0 1"
             game.fen = pre_checkmate_fen
@@ -250,16 +265,16 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
             msg = await self.wait_for_message_type(comm1, "game_over", timeout=5)
             self.assertEqual(msg["payload"]["reason"], "checkmate")
         finally:
-            await self.safe_disconnect(comm1)
-            await self.safe_disconnect(comm2)
+            await self.safe_disconnect(comm1, comm2)
 
     async def test_game_end_by_stalemate(self):
         import chess
 
         user1, user2, game = await self.ensure_test_game()
         code = game.code
-        comm1 = await self.ws_connect(user1, code)
-        comm2 = await self.ws_connect(user2, code)
+        comm1, comm2 = await asyncio.gather(
+            self.ws_connect(user1, code), self.ws_connect(user2, code)
+        )
         try:
             pre_stalemate_fen = "7k/5Q2/7K/8/8/8/8/8 w - - 0 1"
             game.fen = pre_stalemate_fen
@@ -270,14 +285,14 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
             msg = await self.wait_for_message_type(comm1, "game_over", timeout=5)
             self.assertEqual(msg["payload"]["reason"], "draw")
         finally:
-            await self.safe_disconnect(comm1)
-            await self.safe_disconnect(comm2)
+            await self.safe_disconnect(comm1, comm2)
 
     async def test_resign(self):
         user1, user2, game = await self.ensure_test_game()
         code = game.code
-        comm1 = await self.ws_connect(user1, code)
-        comm2 = await self.ws_connect(user2, code)
+        comm1, comm2 = await asyncio.gather(
+            self.ws_connect(user1, code), self.ws_connect(user2, code)
+        )
         try:
             await comm1.send_json_to({"type": "resign"})
             try:
@@ -297,14 +312,14 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
                     pass
                 raise
         finally:
-            await self.safe_disconnect(comm1)
-            await self.safe_disconnect(comm2)
+            await self.safe_disconnect(comm1, comm2)
 
     async def test_draw_offer_and_accept(self):
         user1, user2, game = await self.ensure_test_game()
         code = game.code
-        comm1 = await self.ws_connect(user1, code)
-        comm2 = await self.ws_connect(user2, code)
+        comm1, comm2 = await asyncio.gather(
+            self.ws_connect(user1, code), self.ws_connect(user2, code)
+        )
         try:
             await comm1.send_json_to({"type": "draw_offer"})
             offer_msg = await self.wait_for_message_type(comm2, "draw_offer", timeout=5)
@@ -314,16 +329,16 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
             self.assertEqual(over_msg["type"], "game_over")
             self.assertEqual(over_msg["payload"]["reason"], "draw_agreed")
         finally:
-            await self.safe_disconnect(comm1)
-            await self.safe_disconnect(comm2)
+            await self.safe_disconnect(comm1, comm2)
 
-    async def safe_disconnect(self, communicator):
-        """Safely disconnect a WebSocket communicator, handling any exceptions."""
-        if communicator:
-            try:
-                await communicator.disconnect()
-            except Exception as e:
-                print(f"Warning: Error during disconnect: {e}")
+    async def safe_disconnect(self, *communicators):
+        """Safely disconnect WebSocket communicators concurrently, handling any exceptions."""
+        results = await asyncio.gather(
+            *(c.disconnect() for c in communicators if c), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Warning: Error during disconnect: {result}")
 
     async def test_spectator_cannot_move_resign_or_draw(self):
         user1, user2, game = await self.ensure_test_game()
@@ -352,11 +367,7 @@ class GameWebSocketTests(ChannelsLiveServerTestCase):
             await self.safe_disconnect(comm3)
 
     async def test_ai_game_ws_flow(self):
-        from .models import CustomUser, Game
-
-        user1, _ = await database_sync_to_async(CustomUser.objects.get_or_create)(
-            username="player1", defaults={"password": "pass1"}
-        )
+        user1, _, _ = await self.ensure_test_game()
         game = await database_sync_to_async(Game.objects.create)(
             player_white=user1,
             player_black=None,
@@ -1,12 +1,24 @@
+import asyncio
+import atexit
+import functools
 import logging
 import math
+import os
+import platform
+import re
+import threading
 
 import chess
+import chess.engine
+import orjson
+from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
 import redis  # sync client
 import redis.asyncio as aioredis
 
@@ -15,21 +27,76 @@ _redis_pool = aioredis.ConnectionPool.from_url(
     REDIS_URL, encoding="utf-8", decode_responses=True
 )
 _redis = aioredis.Redis(connection_pool=_redis_pool)
+# asyncio connections belong to the loop that opened them, so each running
+# loop (Daphne's, or one spun up by async_to_sync) gets its own pooled client,
+# which is closed and dropped again when that loop shuts down.
+_loop_redis = {}  # loop -> (client, watcher task)
+_sync_redis = redis.from_url(REDIS_URL, decode_responses=True)
 
 
 def get_redis():
-    return aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _redis
+    entry = _loop_redis.get(loop)
+    if entry is None:
+        client = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool.from_url(
+                REDIS_URL, encoding="utf-8", decode_responses=True
+            )
+        )
+        # Keep the watcher task referenced so it is not garbage collected.
+        watcher = loop.create_task(_close_with_loop(loop, client))
+        entry = _loop_redis[loop] = (client, watcher)
+    return entry[0]
+
+
+async def _close_with_loop(loop, client):
+    """Close a loop's Redis client once the loop shuts down.
+
+    asyncio.run() and async_to_sync cancel every pending task before closing
+    their loop, which is what ends this wait.
+    """
+    try:
+        await loop.create_future()
+    finally:
+        _loop_redis.pop(loop, None)
+        await client.aclose(close_connection_pool=True)
 
 
 def get_sync_redis():
-    return redis.from_url(REDIS_URL, decode_responses=True)
+    return _sync_redis
+
+
+ANALYSIS_CACHE_TTL = 60 * 60  # seconds; completed analyses never change
+
+
+def analysis_cache_key(game_code):
+    return f"game:{game_code}:analysis"
+
+
+def dumps_json(data) -> bytes:
+    """Encode data as JSON bytes with orjson, stringifying unknown types."""
+    return orjson.dumps(data, default=str, option=ORJSON_OPTIONS)
+
+
+FEN_RE = re.compile(
+    r"^[rnbqkpRNBQKP1-8/]+ [wb] (?:-|[KQkqA-Ha-h]+) (?:-|[a-h][36])(?: \d+ \d+)?$"
+)
+_fen_board = threading.local()
 
 
 def is_valid_fen(fen):
+    if not isinstance(fen, str) or not FEN_RE.match(fen.strip()):
+        return False
+    board = getattr(_fen_board, "board", None)
+    if board is None:
+        board = _fen_board.board = chess.Board.empty()
     try:
-        chess.Board(fen)
+        board.set_fen(fen)
         return True
-    except Exception:
+    except ValueError:
         return False
 
 
@@ -39,98 +106,136 @@ async def update_fen(game, fen):
         raise ValueError(f"Invalid FEN attempted to be saved: {fen}")
 
     game.fen = fen
-    await database_sync_to_async(game.save)()
+    # The row and the cached FEN are independent writes; issue them together.
+    await asyncio.gather(
+        database_sync_to_async(game.save)(),
+        get_redis().set(f"game:{game.code}:fen", fen),
+    )
 
-    redis = get_redis()
-    await redis.set(f"game:{game.code}:fen", fen)
 
+_engine_local = threading.local()
+_engines = []
+_engines_lock = threading.Lock()
 
-def update_fen_sync(game, fen):
-    """Synchronous version of update_fen for use in Celery tasks."""
-    if not is_valid_fen(fen):
-        logger.error(f"Attempted to save invalid FEN: {fen}")
-        raise ValueError(f"Invalid FEN attempted to be saved: {fen}")
 
-    game.fen = fen
-    game.save()
-
-    redis = get_sync_redis()
-    redis.set(f"game:{game.code}:fen", fen)
+def _resolve_stockfish_path():
+    if platform.system() == "Linux":
+        path = (
+            settings.BASE_DIR
+            / "stockfish-linux"
+            / "stockfish"
+            / "stockfish-ubuntu-x86-64-avx2"
+        )
+    else:
+        path = settings.BASE_DIR / "stockfish-win" / "stockfish-windows-x86-64-avx2.exe"
+    return str(path)
+
+
+STOCKFISH_PATH = _resolve_stockfish_path()
+STOCKFISH_AVAILABLE = os.path.exists(STOCKFISH_PATH)
+if not STOCKFISH_AVAILABLE:
+    logger.warning(f"Stockfish binary not found at {STOCKFISH_PATH}")
+
+
+def get_engine():
+    """Return this thread's Stockfish process, starting it on first use."""
+    engine = getattr(_engine_local, "engine", None)
+    if engine is None:
+        if not STOCKFISH_AVAILABLE:
+            raise FileNotFoundError(f"Stockfish binary not found at {STOCKFISH_PATH}")
+        engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
+        engine.configure(
+            {"Threads": settings.STOCKFISH_THREADS, "Hash": settings.STOCKFISH_HASH_MB}
+        )
+        _engine_local.engine = engine
+        with _engines_lock:
+            _engines.append(engine)
+    return engine
+
+
+def close_engine():
+    """Shut down this thread's Stockfish process so the next call respawns it."""
+    engine = getattr(_engine_local, "engine", None)
+    _engine_local.engine = None
+    if engine is not None:
+        with _engines_lock:
+            if engine in _engines:
+                _engines.remove(engine)
+        try:
+            engine.quit()
+        except Exception as e:
+            logger.warning(f"Error shutting down Stockfish engine: {e}")
+
+
+@atexit.register
+def _quit_engines():
+    with _engines_lock:
+        engines, _engines[:] = list(_engines), []
+    for engine in engines:
+        try:
+            engine.quit()
+        except Exception:
+            pass
 
 
 def evaluate_board(board: chess.Board) -> float:
+    if not STOCKFISH_AVAILABLE:
+        return _fallback_evaluation(board)
     try:
-        import platform
-        from django.conf import settings
-
-        if platform.system() == "Linux":
-            stockfish_path = (
-                settings.BASE_DIR
-                / "stockfish-linux"
-                / "stockfish"
-                / "stockfish-ubuntu-x86-64-avx2"
-            )
+        engine = get_engine()
+        info = engine.analyse(
+            board,
+            chess.engine.Limit(
+                depth=settings.STOCKFISH_EVAL_DEPTH, time=settings.STOCKFISH_EVAL_TIME
+            ),
+        )
+
+        if "score" in info and info["score"] is not None:
+            score = info["score"].white().score(mate_score=10000)
+            if score is not None:
+                return score / 100.0  # Convert to pawns
+            else:
+                return 10.0 if info["score"].white().mate() > 0 else -10.0
         else:
-            stockfish_path = (
-                settings.BASE_DIR
-                / "stockfish-win"
-                / "stockfish-windows-x86-64-avx2.exe"
-            )
-        if not stockfish_path.exists():
-            logger.warning(
-                f"Stockfish not found at {stockfish_path}, using fallback evaluation"
-            )
             return _fallback_evaluation(board)
-        import chess.engine
-
-        with chess.engine.SimpleEngine.popen_uci(str(stockfish_path)) as engine:
-            engine.configure({"Threads": 1, "Hash": 16})
-            info = engine.analyse(board, chess.engine.Limit(depth=10, time=0.1))
-
-            if "score" in info and info["score"] is not None:
-                score = info["score"].white().score(mate_score=10000)
-                if score is not None:
-                    return score / 100.0  # Convert to pawns
-                else:
-                    return 10.0 if info["score"].white().mate() > 0 else -10.0
-            else:
-                return _fallback_evaluation(board)
 
     except Exception as e:
         logger.warning(f"Stockfish evaluation failed: {e}, using fallback")
+        close_engine()
         return _fallback_evaluation(board)
 
 
-def _fallback_evaluation(board: chess.Board) -> float:
-    values = {
-        chess.PAWN: 100,
-        chess.KNIGHT: 320,
-        chess.BISHOP: 330,
-        chess.ROOK: 500,
-        chess.QUEEN: 900,
-        chess.KING: 0,
-    }
+PIECE_VALUES = (
+    (chess.PAWN, 100),
+    (chess.KNIGHT, 320),
+    (chess.BISHOP, 330),
+    (chess.ROOK, 500),
+    (chess.QUEEN, 900),
+)
+CENTER_MASK = chess.BB_E4 | chess.BB_D4 | chess.BB_E5 | chess.BB_D5
 
+
+def _fallback_evaluation(board: chess.Board) -> float:
+    pieces_mask = board.pieces_mask
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
     score = 0
-    for piece_type in values:
-        score += len(board.pieces(piece_type, chess.WHITE)) * values[piece_type]
-        score -= len(board.pieces(piece_type, chess.BLACK)) * values[piece_type]
-    center = [chess.E4, chess.D4, chess.E5, chess.D5]
-    for sq in center:
-        piece = board.piece_at(sq)
-        if piece:
-            if piece.color == chess.WHITE:
-                score += 20
-            else:
-                score -= 20
-    score += (
-        5 * len(list(board.legal_moves))
-        if board.turn == chess.WHITE
-        else -5 * len(list(board.legal_moves))
+    for piece_type, value in PIECE_VALUES:
+        score += value * (
+            pieces_mask(piece_type, chess.WHITE).bit_count()
+            - pieces_mask(piece_type, chess.BLACK).bit_count()
+        )
+    score += 20 * (
+        (white & CENTER_MASK).bit_count() - (black & CENTER_MASK).bit_count()
     )
+    mobility = board.legal_moves.count()
+    score += 5 * mobility if board.turn == chess.WHITE else -5 * mobility
     return score / 100.0
 
 
+LN10_OVER_400 = math.log(10) / 400
+
+
+@functools.lru_cache(maxsize=4096)
 def get_gradual_k(games_played, rating, k_max=40, k_min=10, decay_rate=0.03):
     k_experience = k_min + (k_max - k_min) * math.exp(-decay_rate * games_played)
     rating_factor = max(0.5, 1 - (rating - 1000) / 2000)  # Caps at 0.5 for high ratings
@@ -140,7 +245,7 @@ def get_gradual_k(games_played, rating, k_max=40, k_min=10, decay_rate=0.03):
 
 
 def calculate_elo(rating_a, rating_b, score_a, games_a, games_b):
-    expected_a = 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+    expected_a = 1 / (1 + math.exp((rating_b - rating_a) * LN10_OVER_400))
     expected_b = 1 - expected_a
     score_b = 1 - score_a
 
@@ -153,7 +258,14 @@ def calculate_elo(rating_a, rating_b, score_a, games_a, games_b):
     return new_a, new_b
 
 
-from asgiref.sync import async_to_sync
+@functools.cache
+def _game_end_hooks():
+    # core.consumers and core.tasks both import this module, so resolve them
+    # on first use and keep the result.
+    from core.consumers import GameConsumer
+    from core.tasks import analyze_game_task
+
+    return getattr(GameConsumer, "update_elo", None), analyze_game_task
 
 
 def end_game_and_update_elo(game, winner=None, draw=False):
@@ -167,17 +279,13 @@ def end_game_and_update_elo(game, winner=None, draw=False):
         game.status = "finished"
         game.result = "draw_by_timeout"
     game.save()
-    try:
-        from core.consumers import GameConsumer
-
-        update_elo = getattr(GameConsumer, "update_elo", None)
-        if update_elo:
+    update_elo, analyze_game_task = _game_end_hooks()
+    if update_elo:
+        try:
             async_to_sync(update_elo)(None, game, winner=winner, draw=draw)
-    except Exception as e:
-        logger.error(f"Error updating Elo for game {game.id}: {e}")
+        except Exception as e:
+            logger.error(f"Error updating Elo for game {game.id}: {e}")
     try:
-        from core.tasks import analyze_game_task
-
         analyze_game_task.delay(game.id)
     except Exception as e:
         logger.error(f"Error triggering analysis for game {game.id}: {e}")
@@ -1,9 +1,13 @@
 import json
+import logging
 import random
-import asyncio
 
+import redis
 from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
@@ -16,12 +20,42 @@ from core.tasks import (
     update_game_cache_and_broadcast_task,
     update_user_quiz_stats,
 )
+from core.utils import (
+    ANALYSIS_CACHE_TTL,
+    analysis_cache_key,
+    dumps_json,
+    get_sync_redis,
+)
 from users.models import CustomUser
 
-from .models import Game, GameAnalysis, Move, QuizQuestion
+from .models import Game, Move, QuizQuestion
 from .serializers import GameSerializer, MoveSerializer, QuizQuestionSerializer
 from .matchmaking import MatchmakingService
 
+logger = logging.getLogger(__name__)
+
+
+def _game_detail_queryset():
+    # Load everything GameSerializer renders up front, minus the players'
+    # password hashes which it never outputs.
+    return (
+        Game.objects.select_related("player_white", "player_black", "analysis")
+        .prefetch_related("moves")
+        .defer("player_white__password", "player_black__password")
+    )
+
+
+def _game_response(game_id, spectator):
+    # request.user is only partially loaded by the auth cache, so render the
+    # game from fully loaded players instead of the instance just saved.
+    game = _game_detail_queryset().get(pk=game_id)
+    return Response({"spectator": spectator, **GameSerializer(game).data})
+
+
+def _on_game_joined(game_id, game_code, subject_list):
+    generate_quizs_in_advance.delay(game_id, 5, subject_list)
+    update_game_cache_and_broadcast_task.delay(game_id, game_code)
+
 
 class GameCreateJoinView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -36,18 +70,21 @@ class GameCreateJoinView(APIView):
                 subject_list = [subject_list]
         subject_list = subject_list[:3]
         if code:
-            game = get_object_or_404(Game, code=code)
-            updated = False
-            if not game.player_black and game.player_white != request.user:
-                game.player_black = request.user
-                game.status = "active"
-                game.save()
-                updated = True
-                print(game.status)
-                generate_quizs_in_advance.delay(game.id, 5, subject_list)
-            channel_layer = get_channel_layer()
-            update_game_cache_and_broadcast_task.delay(game.id, game.code)
-            return Response({"spectator": not updated, **GameSerializer(game).data})
+            with transaction.atomic():
+                game = get_object_or_404(Game.objects.select_for_update(), code=code)
+                updated = (
+                    game.player_black_id is None
+                    and game.player_white_id != request.user.id
+                )
+                if updated:
+                    game.player_black = request.user
+                    game.status = "active"
+                    game.save(update_fields=["player_black", "status", "updated_at"])
+                    logger.debug("game %s status -> %s", game.id, game.status)
+                    transaction.on_commit(
+                        lambda: _on_game_joined(game.id, game.code, subject_list)
+                    )
+            return _game_response(game.id, spectator=not updated)
         is_vs_ai = request.data.get("is_vs_ai", False)
         ai_difficulty = request.data.get("ai_difficulty", "easy")
         if is_vs_ai:
@@ -67,7 +104,7 @@ class GameCreateJoinView(APIView):
                 is_vs_ai=False,
                 ai_difficulty="",
             )
-        return Response({"spectator": False, **GameSerializer(game).data})
+        return _game_response(game.id, spectator=False)
 
 
 class GameDetailView(generics.RetrieveAPIView):
@@ -76,6 +113,9 @@ class GameDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = "code"
 
+    def get_queryset(self):
+        return _game_detail_queryset()
+
 
 class QuizQuestionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -83,9 +123,10 @@ class QuizQuestionView(APIView):
     def get(self, request):
         subject = request.query_params.get("subject", "Math")
         questions = QuizQuestion.objects.filter(subject=subject)
-        if not questions.exists():
+        count = questions.count()
+        if not count:
             return Response({"detail": "No questions available."}, status=404)
-        question = random.choice(list(questions))
+        question = questions.order_by("pk")[random.randrange(count)]
         return Response(QuizQuestionSerializer(question).data)
 
 
@@ -98,9 +139,12 @@ class QuizAnswerView(APIView):
         question_id = request.data.get("question_id")
         question = get_object_or_404(QuizQuestion, id=question_id)
         correct = answer == question.correct_option
-        move.quiz_correct = correct
-        move.save()
-        update_user_quiz_stats.delay(request.user.id, correct)
+        user_id = request.user.id
+        with transaction.atomic():
+            Move.objects.filter(pk=move.pk).update(quiz_correct=correct)
+            transaction.on_commit(
+                lambda: update_user_quiz_stats.delay(user_id, correct)
+            )
         return Response({"correct": correct})
 
 
@@ -108,26 +152,49 @@ class GameAnalysisView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, code):
+        r = get_sync_redis()
+        key = analysis_cache_key(code)
         try:
-            game = Game.objects.get(code=code)
-        except Game.DoesNotExist:
+            cached = r.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Analysis cache read failed for game {code}: {e}")
+            cached = None
+        if cached:
+            return HttpResponse(cached, content_type="application/json")
+        # per_move can be long; read it as jsonb text and splice it into the
+        # body instead of decoding it into Python objects and re-encoding.
+        row = (
+            Game.objects.filter(code=code)
+            .annotate(per_move_raw=Cast("analysis__per_move", TextField()))
+            .values(
+                "analysis_status", "analysis__id", "analysis__overall", "per_move_raw"
+            )
+            .first()
+        )
+        if row is None:
             return Response(
                 {"detail": "Game not found."}, status=status.HTTP_404_NOT_FOUND
             )
-        user = request.user
-        try:
-            analysis = game.analysis
-        except GameAnalysis.DoesNotExist:
+        if row["analysis__id"] is None:
             return Response(
                 {"detail": "Analysis not available yet."},
                 status=status.HTTP_202_ACCEPTED,
             )
-        return Response(
-            {
-                "overall": analysis.overall,
-                "per_move": analysis.per_move,
-            }
+        body = b"".join(
+            (
+                b'{"overall":',
+                dumps_json(row["analysis__overall"]),
+                b',"per_move":',
+                row["per_move_raw"].encode(),
+                b"}",
+            )
         )
+        if row["analysis_status"] == "completed":
+            try:
+                r.set(key, body, ex=ANALYSIS_CACHE_TTL)
+            except redis.RedisError as e:
+                logger.warning(f"Analysis cache write failed for game {code}: {e}")
+        return HttpResponse(body, content_type="application/json")
 
 
 class HealthCheckView(APIView):
@@ -142,16 +209,8 @@ class HealthCheckView(APIView):
 def matchmaking_status(request):
     """Get current matchmaking queue status."""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            matchmaking_service = MatchmakingService()
-            status_data = loop.run_until_complete(
-                matchmaking_service.get_queue_status()
-            )
-            return Response(status_data)
-        finally:
-            loop.close()
+        status_data = async_to_sync(MatchmakingService().get_queue_status)()
+        return Response(status_data)
     except Exception as e:
         return Response(
             {"error": "Failed to get matchmaking status"},
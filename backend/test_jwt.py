@@ -25,7 +25,7 @@ def test_jwt_token(token):
         print(f"User ID: {user_id}")
 
         if user_id:
-            user = User.objects.get(id=user_id)
+            user = User.objects.only("id", "username").get(id=user_id)
             print(f"Found user: {user.username}")
             return True
         else:
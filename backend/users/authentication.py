@@ -0,0 +1,73 @@
+import logging
+
+import orjson
+import redis
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from core.utils import dumps_json, get_sync_redis
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+AUTH_USER_CACHE_TTL = 60  # seconds
+# Only what authentication itself needs; anything else is loaded on access.
+AUTH_USER_FIELDS = ("id", "username", "is_active")
+
+
+def auth_user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """Return a partially loaded user from Redis, or None on a miss."""
+    try:
+        cached = get_sync_redis().get(auth_user_cache_key(user_id))
+    except redis.RedisError as e:
+        logger.warning(f"Auth user cache read failed: {e}")
+        return None
+    if not cached:
+        return None
+    data = orjson.loads(cached)
+    return CustomUser.from_db(
+        DEFAULT_DB_ALIAS,
+        list(AUTH_USER_FIELDS),
+        [data[field] for field in AUTH_USER_FIELDS],
+    )
+
+
+def cache_user(user):
+    data = {field: getattr(user, field) for field in AUTH_USER_FIELDS}
+    try:
+        get_sync_redis().set(
+            auth_user_cache_key(user.pk), dumps_json(data), ex=AUTH_USER_CACHE_TTL
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Auth user cache write failed: {e}")
+
+
+def invalidate_cached_user(user_id):
+    try:
+        get_sync_redis().delete(auth_user_cache_key(user_id))
+    except redis.RedisError as e:
+        logger.warning(f"Auth user cache invalidation failed: {e}")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that resolves the token's user from Redis.
+
+    Only active users are cached, and the entry is dropped whenever the user
+    is saved or deleted, so a cache hit can skip the inactive check.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            user = get_cached_user(user_id)
+            if user is not None:
+                return user
+        user = super().get_user(validated_token)
+        cache_user(user)
+        return user
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2025-07-21 12:30
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="customuser",
+            index=models.Index(fields=["-rating"], name="user_rating_desc_idx"),
+        ),
+    ]
@@ -18,3 +18,8 @@ class CustomUser(AbstractUser):
         null=True,
         help_text="User's default subject for quiz questions",
     )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["-rating"], name="user_rating_desc_idx"),
+        ]
@@ -1,9 +1,118 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Case, CharField, F, Q, Value, When
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-import logging
+
+from core.models import Game
 
 from .models import CustomUser
 
+logger = logging.getLogger(__name__)
+
+PROFILE_GAMES_LIMIT = 25
+MAX_PROFILE_GAMES_LIMIT = 100
+BULK_REGISTER_BATCH_SIZE = 500
+
+# Columns read for each game in a user's profile; related players and the
+# analysis come through the same query as joined columns.
+GAME_VALUES = (
+    "id",
+    "code",
+    "status",
+    "fen",
+    "is_vs_ai",
+    "ai_difficulty",
+    "analysis_status",
+    "created_at",
+    "updated_at",
+    "winner__id",
+    "winner__username",
+    "winner__rating",
+    "player_white__id",
+    "player_white__username",
+    "player_white__rating",
+    "player_black__id",
+    "player_black__username",
+    "player_black__rating",
+    "analysis__id",
+    "analysis__overall",
+    "analysis__per_move",
+)
+
+# Outcome of a finished game from the winner column, computed in SQL.
+GAME_RESULT = Case(
+    When(status="finished", winner__isnull=True, then=Value("draw")),
+    When(status="finished", winner=F("player_white"), then=Value("white_win")),
+    When(status="finished", winner=F("player_black"), then=Value("black_win")),
+    default=Value(None),
+    output_field=CharField(),
+)
+
+
+def _game_from_row(row):
+    """Build a profile game dict from a ``GAME_VALUES + ("result",)`` tuple."""
+    (
+        game_id,
+        code,
+        status,
+        fen,
+        is_vs_ai,
+        ai_difficulty,
+        analysis_status,
+        created_at,
+        updated_at,
+        winner_id,
+        winner_username,
+        winner_rating,
+        white_id,
+        white_username,
+        white_rating,
+        black_id,
+        black_username,
+        black_rating,
+        analysis_id,
+        analysis_overall,
+        analysis_per_move,
+        result,
+    ) = row
+    return {
+        "id": game_id,
+        "code": code,
+        "status": status,
+        "result": result,
+        "fen": fen,
+        "subject": None,
+        "is_vs_ai": is_vs_ai,
+        "ai_difficulty": ai_difficulty,
+        "score": None,
+        "analysis_status": analysis_status,
+        "analysis": (
+            {"overall": analysis_overall, "per_move": analysis_per_move}
+            if analysis_status == "completed" and analysis_id
+            else None
+        ),
+        "winner": (
+            {"id": winner_id, "username": winner_username, "rating": winner_rating}
+            if winner_id is not None
+            else None
+        ),
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "player_white": (
+            {"id": white_id, "username": white_username, "rating": white_rating}
+            if white_id is not None
+            else None
+        ),
+        "player_black": (
+            {"id": black_id, "username": black_username, "rating": black_rating}
+            if black_id is not None
+            else None
+        ),
+    }
+
 
 class UserSerializer(serializers.ModelSerializer):
     games = serializers.SerializerMethodField()
@@ -12,89 +121,53 @@ class UserSerializer(serializers.ModelSerializer):
         model = CustomUser
         exclude = ["password"]
 
+    def get_fields(self):
+        # Game history is opt-in: nested and list usages skip it entirely.
+        fields = super().get_fields()
+        if not self.context.get("include_games", False):
+            fields.pop("games", None)
+        return fields
+
+    def _games_limit(self):
+        """Number of recent games to include, from the ``games_limit`` query param."""
+        request = self.context.get("request")
+        if request is None:
+            return PROFILE_GAMES_LIMIT
+        try:
+            limit = int(request.query_params.get("games_limit", PROFILE_GAMES_LIMIT))
+        except (TypeError, ValueError):
+            return PROFILE_GAMES_LIMIT
+        return min(max(limit, 1), MAX_PROFILE_GAMES_LIMIT)
+
     def get_games(self, obj):
-        logger = logging.getLogger(__name__)
-        games = obj.games_white.all() | obj.games_black.all()
-        games = games.order_by("-created_at")
-        result = []
-        for game in games:
-            try:
-                computed_result = None
-                if game.status == "finished":
-                    if game.winner is None:
-                        computed_result = "draw"
-                    elif game.winner == game.player_white:
-                        computed_result = "white_win"
-                    elif game.winner == game.player_black:
-                        computed_result = "black_win"
-                analysis_data = None
-                if (
-                    hasattr(game, "analysis_status")
-                    and game.analysis_status == "completed"
-                ):
-                    try:
-                        from core.models import GameAnalysis
-
-                        analysis = GameAnalysis.objects.filter(game=game).first()
-                        if analysis:
-                            analysis_data = {
-                                "overall": analysis.overall,
-                                "per_move": analysis.per_move,
-                            }
-                    except Exception as e:
-                        logger.error(f"Error getting analysis for game {game.id}: {e}")
-
-                result.append(
-                    {
-                        "id": getattr(game, "id", None),
-                        "code": getattr(game, "code", None),
-                        "status": getattr(game, "status", None),
-                        "result": computed_result,
-                        "fen": getattr(game, "fen", None),
-                        "subject": getattr(game, "subject", None),
-                        "is_vs_ai": getattr(game, "is_vs_ai", None),
-                        "ai_difficulty": getattr(game, "ai_difficulty", None),
-                        "score": getattr(game, "score", None),
-                        "analysis_status": getattr(game, "analysis_status", None),
-                        "analysis": analysis_data,
-                        "winner": (
-                            {
-                                "id": getattr(game.winner, "id", None),
-                                "username": getattr(game.winner, "username", None),
-                                "rating": getattr(game.winner, "rating", None),
-                            }
-                            if getattr(game, "winner", None)
-                            else None
-                        ),
-                        "created_at": getattr(game, "created_at", None),
-                        "updated_at": getattr(game, "updated_at", None),
-                        "player_white": (
-                            {
-                                "id": getattr(game.player_white, "id", None),
-                                "username": getattr(
-                                    game.player_white, "username", None
-                                ),
-                                "rating": getattr(game.player_white, "rating", None),
-                            }
-                            if getattr(game, "player_white", None)
-                            else None
-                        ),
-                        "player_black": (
-                            {
-                                "id": getattr(game.player_black, "id", None),
-                                "username": getattr(
-                                    game.player_black, "username", None
-                                ),
-                                "rating": getattr(game.player_black, "rating", None),
-                            }
-                            if getattr(game, "player_black", None)
-                            else None
-                        ),
-                    }
-                )
-            except Exception as e:
-                logger.error(f"Error serializing game for user profile: {e}")
-        return result
+        try:
+            games = (
+                Game.objects.filter(Q(player_white=obj) | Q(player_black=obj))
+                .annotate(result=GAME_RESULT)
+                .order_by("-created_at")
+                .values_list(*GAME_VALUES, "result")[: self._games_limit()]
+            )
+            return [_game_from_row(row) for row in games]
+        except Exception as e:
+            logger.error(f"Error serializing games for user profile: {e}")
+            return []
+
+
+class LeaderboardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = [
+            "id",
+            "username",
+            "rating",
+            "games_played",
+            "games_won",
+            "games_lost",
+            "games_drawn",
+            "quiz_correct",
+            "quiz_attempted",
+            "preferred_subject",
+        ]
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -132,6 +205,37 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         )
         return user
 
+    @classmethod
+    def bulk_register(cls, rows, max_workers=4):
+        """Create many users at once, e.g. for seeding or batch signups.
+
+        Passwords are hashed in a thread pool and the users are inserted with
+        a single bulk INSERT per batch. Rows whose username already exists are
+        skipped.
+        """
+        rows = list(rows)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            hashes = list(executor.map(make_password, (r["password"] for r in rows)))
+        users = [
+            CustomUser(
+                username=r["username"],
+                email=r.get("email", ""),
+                password=h,
+                rating=r.get("rating", 1200),
+                games_played=r.get("games_played", 0),
+                games_won=r.get("games_won", 0),
+                games_lost=r.get("games_lost", 0),
+                games_drawn=r.get("games_drawn", 0),
+                quiz_correct=r.get("quiz_correct", 0),
+                quiz_attempted=r.get("quiz_attempted", 0),
+                preferred_subject=r.get("preferred_subject"),
+            )
+            for r, h in zip(rows, hashes)
+        ]
+        return CustomUser.objects.bulk_create(
+            users, batch_size=BULK_REGISTER_BATCH_SIZE, ignore_conflicts=True
+        )
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = CustomUser.USERNAME_FIELD
@@ -3,11 +3,17 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from core.utils import get_sync_redis
+
 from .models import CustomUser
+from .authentication import auth_user_cache_key
+from .serializers import UserRegistrationSerializer
+from .views import LEADERBOARD_CACHE_KEY
 
 
 class UserAPITests(APITestCase):
     def setUp(self):
+        get_sync_redis().delete(LEADERBOARD_CACHE_KEY)
         self.register_url = reverse("user-register")
         self.login_url = reverse("token_obtain_pair")
         self.profile_url = reverse("user-profile")
@@ -39,6 +45,24 @@ class UserAPITests(APITestCase):
         self.assertIn("access", response.data)
         self.assertIn("refresh", response.data)
 
+    def test_bulk_register(self):
+        UserRegistrationSerializer.bulk_register(
+            [
+                {"username": "bulk1", "password": "bulkpass123"},
+                {"username": "bulk2", "password": "bulkpass456", "rating": 1400},
+                {"username": "existinguser", "password": "ignored123"},
+            ]
+        )
+        self.assertTrue(
+            CustomUser.objects.get(username="bulk1").check_password("bulkpass123")
+        )
+        self.assertEqual(CustomUser.objects.get(username="bulk2").rating, 1400)
+        self.assertTrue(
+            CustomUser.objects.get(username="existinguser").check_password(
+                "existingpass123"
+            )
+        )
+
     def test_login_failure(self):
         response = self.client.post(
             self.login_url, {"username": "nouser", "password": "wrongpass"}
@@ -58,6 +82,32 @@ class UserAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["username"], "profileuser")
 
+    def test_authenticated_user_cached_until_saved(self):
+        login = self.client.post(
+            self.login_url,
+            {"username": "existinguser", "password": "existingpass123"},
+        )
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + login.data["access"])
+        key = auth_user_cache_key(self.user.pk)
+        get_sync_redis().delete(key)
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rating"], 1500)
+        self.assertTrue(get_sync_redis().exists(key))
+        self.user.save()
+        self.assertFalse(get_sync_redis().exists(key))
+
+    def test_profile_games_limit(self):
+        from core.models import Game
+
+        Game.objects.bulk_create(
+            [Game(player_white=self.user, code=f"limitgame{i}") for i in range(3)]
+        )
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.profile_url, {"games_limit": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["games"]), 2)
+
     def test_leaderboard(self):
         CustomUser.objects.create_user(
             username="topuser", password="topuserpass", rating=2000
@@ -67,3 +117,14 @@ class UserAPITests(APITestCase):
         usernames = [u["username"] for u in response.data]
         self.assertIn("topuser", usernames)
         self.assertIn("existinguser", usernames)
+
+    def test_leaderboard_served_from_cache(self):
+        self.client.get(self.leaderboard_url)
+        CustomUser.objects.create_user(
+            username="newcomer", password="newcomerpass", rating=2500
+        )
+        response = self.client.get(self.leaderboard_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        usernames = [u["username"] for u in response.data]
+        self.assertNotIn("newcomer", usernames)
+        self.assertNotIn("games", response.data[0])
@@ -1,14 +1,27 @@
+import logging
+
+import orjson
+import redis
 from django.shortcuts import render
 from rest_framework import generics, permissions
+from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from core.utils import dumps_json, get_sync_redis
+
 from .models import CustomUser
 from .serializers import (
     CustomTokenObtainPairSerializer,
+    LeaderboardSerializer,
     UserRegistrationSerializer,
     UserSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_CACHE_KEY = "leaderboard:v1"
+LEADERBOARD_CACHE_TTL = 15  # seconds
+
 
 class UserRegistrationView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
@@ -22,14 +35,38 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user comes from the auth cache with only a few fields loaded.
+        return CustomUser.objects.get(pk=self.request.user.pk)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "include_games": True}
 
 
 class LeaderboardView(generics.ListAPIView):
     queryset = CustomUser.objects.order_by("-rating")[:20]
-    serializer_class = UserSerializer
+    serializer_class = LeaderboardSerializer
     permission_classes = [permissions.AllowAny]
 
+    def list(self, request, *args, **kwargs):
+        r = get_sync_redis()
+        try:
+            cached = r.get(LEADERBOARD_CACHE_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Leaderboard cache read failed: {e}")
+            cached = None
+        if cached:
+            return Response(orjson.loads(cached))
+        response = super().list(request, *args, **kwargs)
+        try:
+            r.set(
+                LEADERBOARD_CACHE_KEY,
+                dumps_json(response.data),
+                ex=LEADERBOARD_CACHE_TTL,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Leaderboard cache write failed: {e}")
+        return response
+
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer